@@ -0,0 +1,141 @@
+import copy
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.models import Profile
+
+
+# What a token resolves to; user carries its profile so views don't query it
+CachedIdentity = namedtuple('CachedIdentity', ['user', 'token', 'role', 'assigned_year', 'expires_at', 'cached_at'])
+
+
+def token_expires_at(token):
+    """When the token stops being accepted, or None if API_TOKEN_EXPIRY is off"""
+    if not settings.API_TOKEN_EXPIRY:
+        return None
+    return token.created + timedelta(seconds=settings.API_TOKEN_EXPIRY)
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> CachedIdentity with a time-to-live
+
+    The cache is per process: other workers learn about deleted tokens or
+    changed profiles only when their entry's TTL runs out.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.cached_at > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(entry.user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry.user.pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry.user.pk]
+
+
+token_cache = TokenCache(settings.API_TOKEN_CACHE_SIZE, settings.API_TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that resolves token -> (user, role, assigned_year)
+    from an in-process LRU instead of querying on every request"""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user__profile').get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed('Invalid token.')
+            user = token.user
+            try:
+                profile = user.profile
+            except Profile.DoesNotExist:
+                profile = None
+            entry = CachedIdentity(
+                user=user,
+                token=token,
+                role=profile.role if profile else None,
+                assigned_year=profile.assigned_year if profile else None,
+                expires_at=token_expires_at(token),
+                cached_at=time.monotonic(),
+            )
+            token_cache.set(key, entry)
+
+        if not entry.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        if entry.expires_at and entry.expires_at <= timezone.now():
+            token_cache.invalidate(key)
+            raise AuthenticationFailed('Token has expired.')
+
+        # Each request gets its own copy of the cached user
+        return copy.copy(entry.user), entry.token
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
@@ -15,4 +15,5 @@ class AttendanceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Attendance
-        fields = ['id', 'student', 'student_name', 'student_class', 'date', 'status', 'remarks']
\ No newline at end of file
+        fields = ['id', 'student', 'student_name', 'student_class', 'date', 'status', 'remarks', 'version']
+        read_only_fields = ['version']
\ No newline at end of file
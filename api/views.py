@@ -1,16 +1,47 @@
-from rest_framework import generics, permissions
-from rest_framework.authentication import TokenAuthentication
+from rest_framework import generics, permissions, serializers
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from rest_framework.response import Response
 
 from core.models import Student
+from core.versions import attendance_scope, class_years_for, conditional_report
 from attendance.models import Attendance
+from .authentication import CachedTokenAuthentication, token_expires_at
 from .serializers import StudentSerializer, AttendanceSerializer
 
 
+def _today_report_scopes(request):
+    from datetime import date
+    today = date.today()
+    return [attendance_scope(class_year, today.year, today.month)
+            for class_year in class_years_for(request.user)]
+
+
+class ObtainExpiringAuthToken(ObtainAuthToken):
+    """Token login that replaces an expired token with a fresh one"""
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        token, created = Token.objects.get_or_create(user=user)
+        expires_at = token_expires_at(token)
+        if expires_at and expires_at <= timezone.now():
+            token.delete()
+            token = Token.objects.create(user=user)
+            expires_at = token_expires_at(token)
+
+        return Response({'token': token.key, 'expires_at': expires_at})
+
+
 class StudentList(generics.ListAPIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = StudentSerializer
 
@@ -22,7 +53,7 @@ class StudentList(generics.ListAPIView):
 
 
 class AttendanceList(generics.ListCreateAPIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = AttendanceSerializer
 
@@ -33,11 +64,22 @@ class AttendanceList(generics.ListCreateAPIView):
         students = Student.objects.filter(class_teacher=user)
         return Attendance.objects.filter(student__in=students)
 
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save(marked_by=self.request.user)
+        except IntegrityError:
+            # Marked by someone else between validation and the insert
+            raise serializers.ValidationError(
+                {'non_field_errors': ['Attendance already marked for this student on this date.']}
+            )
+
 
 class ReportView(generics.GenericAPIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(conditional_report(_today_report_scopes, per_day=True))
     def get(self, request):
         # Simple report endpoint
         from datetime import date
@@ -48,7 +90,7 @@ class ReportView(generics.GenericAPIView):
             present_today = Attendance.objects.filter(date=today, status='present').count()
             absent_today = Attendance.objects.filter(date=today, status='absent').count()
         else:
-            students = Student.objects.filter(assigned_teacher=request.user)
+            students = Student.objects.filter(class_teacher=request.user)
             total_students = students.count()
             present_today = Attendance.objects.filter(
                 student__in=students, date=today, status='present'
@@ -1,14 +1,45 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.admin_utils import EstimatedCountPaginator, teacher_list_filter
 from .models import Attendance
+from .signals import AttendanceChange, notify_attendance_changed
 
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('student', 'date', 'status', 'marked_by', 'created_at')
-    list_filter = ('date', 'status', 'marked_by')
+    list_filter = ('date', 'status', teacher_list_filter('marked_by', 'marked by'))
     search_fields = ('student__student_id', 'student__first_name', 'student__last_name', 'remarks')
-    ordering = ('-date', 'student__student_id')
+    # Served by the (-date, student) index; student_id rather than student,
+    # which would join core_student for its Meta.ordering. A total ordering
+    # too (unique student + date), so no pk is appended.
+    ordering = ('-date', 'student_id')
+    # Drill-down levels come from MIN/MAX lookups (templates/admin/attendance/attendance/change_list.html)
     date_hierarchy = 'date'
+    autocomplete_fields = ('student', 'marked_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Facet counts are a COUNT per filter choice over the whole table
+    show_facets = admin.ShowFacets.NEVER
+    actions = ('mark_excused',)
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('student', 'marked_by')
\ No newline at end of file
+        return super().get_queryset(request).select_related('student', 'marked_by')
+
+    @admin.action(description='Mark selected records as excused')
+    def mark_excused(self, request, queryset):
+        # One UPDATE; the rows it changes are read first for the change notification
+        pending = queryset.exclude(status='excused').order_by()
+        with transaction.atomic():
+            changes = [
+                AttendanceChange(student_pk, class_year, record_date, 'excused')
+                for student_pk, class_year, record_date in pending.values_list('student_id', 'student__year', 'date')
+            ]
+            updated = pending.update(
+                status='excused', marked_by=request.user, updated_at=timezone.now(), version=F('version') + 1,
+            )
+            notify_attendance_changed(changes)
+        self.message_user(request, f'{updated} record(s) marked as excused.', messages.SUCCESS)
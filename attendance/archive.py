@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef
+
+from core.versions import CLASS_YEARS, attendance_scope, bump_versions
+from .models import Attendance, AttendanceArchive
+
+
+STATUSES = [code for code, label in Attendance.STATUS_CHOICES]
+ARCHIVE_FIELDS = ['student_id', 'date', 'status', 'marked_by_id', 'remarks', 'created_at', 'updated_at']
+
+
+def academic_year_of(day):
+    """Calendar year the academic year containing `day` starts in"""
+    return day.year if day.month >= settings.ACADEMIC_YEAR_START_MONTH else day.year - 1
+
+
+def academic_year_bounds(start_year):
+    """First and last day of the academic year starting in start_year"""
+    first_day = date(start_year, settings.ACADEMIC_YEAR_START_MONTH, 1)
+    last_day = date(start_year + 1, settings.ACADEMIC_YEAR_START_MONTH, 1) - timedelta(days=1)
+    return first_day, last_day
+
+
+def archived_through():
+    """Last day of the latest archived academic year, or None if nothing is archived"""
+    last_archived = AttendanceArchive.objects.aggregate(last=Max('date'))['last']
+    if last_archived is None:
+        return None
+    return academic_year_bounds(academic_year_of(last_archived))[1]
+
+
+def archive_academic_year(start_year, export_dir=None, batch_size=5000):
+    """Move a closed academic year's attendance from the live table to the archive
+
+    Rows are copied into AttendanceArchive (and optionally written to a gzip
+    NDJSON file in export_dir) and the live rows are deleted, all in one
+    transaction. The year's report versions are bumped, since cached
+    reports and ETags were built from the live rows. Returns rows moved.
+    """
+    first_day, last_day = academic_year_bounds(start_year)
+    if last_day >= date.today():
+        raise ValueError(f'Academic year {start_year}/{start_year + 1} is not over yet.')
+
+    live = Attendance.objects.filter(date__range=(first_day, last_day)).order_by()
+    with transaction.atomic():
+        moved = 0
+        batch = []
+        for values in live.values_list(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+            batch.append(AttendanceArchive(**dict(zip(ARCHIVE_FIELDS, values))))
+            if len(batch) >= batch_size:
+                moved += _copy(batch)
+                batch = []
+        moved += _copy(batch)
+
+        if export_dir:
+            archived = AttendanceArchive.objects.filter(date__range=(first_day, last_day)).order_by()
+            _export(archived, start_year, export_dir, batch_size)
+
+        # Plain DELETE: the rows live on in the archive, so there is nothing
+        # for per-object delete signals to announce
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Attendance._meta.db_table)} WHERE date BETWEEN %s AND %s',
+                [first_day, last_day]
+            )
+        bump_versions(_academic_year_scopes(start_year))
+    return moved
+
+
+def _academic_year_scopes(start_year):
+    # Every class year: students may have moved up since the rows were marked
+    first_day, last_day = academic_year_bounds(start_year)
+    months = []
+    month = first_day
+    while month <= last_day:
+        months.append((month.year, month.month))
+        month = (month + timedelta(days=32)).replace(day=1)
+    return [
+        scope
+        for class_year in CLASS_YEARS
+        for scope in [attendance_scope(class_year), *(attendance_scope(class_year, *month) for month in months)]
+    ]
+
+
+def _conflict_target(unique_fields):
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    return unique_fields if connection.features.supports_update_conflicts_with_target else None
+
+
+def _copy(batch):
+    # A re-archived day (marked again after its year was archived) replaces the old copy
+    AttendanceArchive.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=_conflict_target(['student', 'date']),
+        update_fields=['status', 'marked_by', 'remarks', 'created_at', 'updated_at'],
+    )
+    return len(batch)
+
+
+def _export(archived, start_year, export_dir, batch_size):
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f'attendance-{start_year}-{start_year + 1}.ndjson.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for values in archived.order_by('date', 'student_id').values_list(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+            f.write(json.dumps(dict(zip(ARCHIVE_FIELDS, values)), default=str, separators=(',', ':')))
+            f.write('\n')
+    return path
+
+
+def _reaches_archive(start, through):
+    return through is not None and (start is None or start <= through)
+
+
+def attendance_values(fields, start=None, end=None, **filters):
+    """Attendance rows as dicts of `fields`, from the live table and, for
+    ranges reaching back into archived years, the archive as well
+
+    A day marked again after its year was archived is in both tables; the
+    live row wins.
+    """
+    return _attendance_rows('values', fields, start, end, filters)
+
+
+def attendance_values_list(fields, start=None, end=None, **filters):
+    """attendance_values() as tuples"""
+    return _attendance_rows('values_list', fields, start, end, filters)
+
+
+def _attendance_rows(method, fields, start, end, filters):
+    live = Attendance.objects.filter(**filters).order_by()
+    if start:
+        live = live.filter(date__gte=start)
+    if end:
+        live = live.filter(date__lte=end)
+    live = getattr(live, method)(*fields)
+
+    if not _reaches_archive(start, archived_through()):
+        return live
+
+    shadowed = Attendance.objects.filter(student_id=OuterRef('student_id'), date=OuterRef('date'))
+    archived = AttendanceArchive.objects.filter(**filters).exclude(Exists(shadowed)).order_by()
+    if start:
+        archived = archived.filter(date__gte=start)
+    if end:
+        archived = archived.filter(date__lte=end)
+    return live.union(getattr(archived, method)(*fields), all=True)
@@ -0,0 +1,323 @@
+import csv
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Student
+from core.versions import attendance_scope, bump_versions
+from .archive import STATUSES, _conflict_target, academic_year_of, archived_through
+from .bitmaps import rebuild_bitmaps
+from .cumulative import rebuild_cumulative
+from .models import Attendance
+
+
+BACKFILL_COLUMNS = ['student_id', 'date', 'status', 'remarks', 'marked_by']
+REQUIRED_COLUMNS = ['student_id', 'date', 'status']
+
+# Status codes and labels, any case
+STATUS_VALUES = {
+    **{code: code for code in STATUSES},
+    **{label.lower(): code for code, label in Attendance.STATUS_CHOICES},
+}
+
+# Rejected rows kept on the result; the rest are only counted (and written to the rejects file)
+MAX_ERRORS_KEPT = 1000
+
+# Students per query when rebuilding derived data
+REBUILD_CHUNK = 1000
+
+
+class BackfillResult:
+    """Outcome of a backfill: row counts, rejected rows and what was touched"""
+
+    def __init__(self, rejects=None):
+        self.total_rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []
+        self.students = set()
+        self.scopes = set()
+        self.academic_years = set()
+        self.batches = 0
+        self._rejects = rejects
+
+    @property
+    def written(self):
+        return self.inserted + self.updated
+
+    def reject(self, row_number, message, values):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append((row_number, message))
+        if self._rejects is not None:
+            self._rejects.writerow([row_number, message, *values])
+
+
+def read_backfill_rows(f):
+    """(column names, iterator of (row number, [values])) of a CSV file object, header checked up front"""
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('The file is empty.')
+    columns = [str(value).strip().lower().replace(' ', '_') for value in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    return columns, (
+        (row_number, values) for row_number, values in enumerate(rows, start=2)
+        if any(value.strip() for value in values)
+    )
+
+
+class _RowParser:
+    """Turns CSV values into Attendance objects with in-memory lookups"""
+
+    def __init__(self, columns, default_user):
+        self.index = {column: columns.index(column) for column in BACKFILL_COLUMNS if column in columns}
+        # student_id -> (pk, class year); one query instead of one per row
+        self.students = {
+            student_id: (pk, year) for student_id, pk, year in Student.objects.values_list('student_id', 'pk', 'year')
+        }
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.default_user = default_user
+        self.today = date.today()
+
+    def _value(self, values, column):
+        position = self.index.get(column)
+        return values[position].strip() if position is not None and position < len(values) else ''
+
+    def parse(self, values):
+        """(Attendance, class year) for a row, or raise ValueError describing what's wrong"""
+        student_id = self._value(values, 'student_id')
+        if student_id not in self.students:
+            raise ValueError(f"Unknown student ID '{student_id}'.")
+        student_pk, class_year = self.students[student_id]
+
+        raw_date = self._value(values, 'date')
+        try:
+            day = date.fromisoformat(raw_date)
+        except ValueError:
+            raise ValueError(f"Invalid date '{raw_date}' (use YYYY-MM-DD).")
+        if day > self.today:
+            raise ValueError(f"Date {day} is in the future.")
+
+        raw_status = self._value(values, 'status')
+        status = STATUS_VALUES.get(raw_status.lower())
+        if status is None:
+            raise ValueError(f"Invalid status '{raw_status}'.")
+
+        username = self._value(values, 'marked_by')
+        marked_by_id = self.users.get(username) if username else self.default_user.pk
+        if marked_by_id is None:
+            raise ValueError(f"Unknown user '{username}' in marked_by.")
+
+        return Attendance(
+            student_id=student_pk, date=day, status=status,
+            remarks=self._value(values, 'remarks'), marked_by_id=marked_by_id,
+        ), class_year
+
+
+def _orm_writer(on_conflict):
+    def write(records):
+        """(inserted, updated, skipped) for one batch, written with bulk_create"""
+        keys = {(record.student_id, record.date) for record in records}
+        candidates = Attendance.objects.filter(
+            student_id__in={student_pk for student_pk, day in keys},
+            date__range=(min(day for student_pk, day in keys), max(day for student_pk, day in keys)),
+        ).order_by().values_list('pk', 'student_id', 'date')
+        existing = {(student_pk, day): pk for pk, student_pk, day in candidates if (student_pk, day) in keys}
+        with transaction.atomic():
+            if on_conflict == 'update':
+                # The version bump that save() does, so open marking pages see the change
+                Attendance.objects.bulk_create(
+                    records,
+                    update_conflicts=True,
+                    unique_fields=_conflict_target(['student', 'date']),
+                    update_fields=['status', 'remarks', 'marked_by', 'updated_at'],
+                )
+                Attendance.objects.filter(pk__in=list(existing.values())).update(version=F('version') + 1)
+                return len(records) - len(existing), len(existing), 0
+            new = [record for record in records if (record.student_id, record.date) not in existing]
+            # ignore_conflicts covers rows marked since the check
+            Attendance.objects.bulk_create(new, ignore_conflicts=True)
+            return len(new), 0, len(records) - len(new)
+    return write
+
+
+# MySQL: rows go to a per-connection staging table with LOAD DATA, then
+# into attendance in one INSERT ... SELECT
+_STAGING_TABLE = 'attendance_backfill_staging'
+_STAGING_COLUMNS = ['student_id', 'date', 'status', 'remarks', 'marked_by_id']
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def enable_local_infile():
+    """Let this process's MySQL connections send LOAD DATA LOCAL files
+
+    Changes the shared connection settings, so only for command processes.
+    The server must allow it too (local_infile=ON).
+    """
+    if connection.vendor != 'mysql':
+        raise ValueError('LOAD DATA is only available on MySQL.')
+    connections.close_all()
+    options = connection.settings_dict.setdefault('OPTIONS', {})
+    options['local_infile'] = 1
+
+
+def _native_writer(on_conflict):
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    columns = ', '.join(_STAGING_COLUMNS)
+    if on_conflict == 'update':
+        insert = (
+            f'INSERT INTO {table} ({columns}, created_at, updated_at, version) '
+            f'SELECT {columns}, %s, %s, 1 FROM {_STAGING_TABLE} '
+            'ON DUPLICATE KEY UPDATE status = VALUES(status), remarks = VALUES(remarks), '
+            f'marked_by_id = VALUES(marked_by_id), updated_at = VALUES(updated_at), version = {table}.version + 1'
+        )
+    else:
+        insert = (
+            f'INSERT IGNORE INTO {table} ({columns}, created_at, updated_at, version) '
+            f'SELECT {columns}, %s, %s, 1 FROM {_STAGING_TABLE}'
+        )
+
+    def write(records):
+        """(inserted, updated, skipped) for one batch, written with LOAD DATA LOCAL INFILE"""
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False) as f:
+            for record in records:
+                f.write('\t'.join([
+                    str(record.student_id), record.date.isoformat(), record.status,
+                    record.remarks.translate(_TSV_ESCAPES), str(record.marked_by_id),
+                ]))
+                f.write('\n')
+        try:
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE} ('
+                    'student_id BIGINT NOT NULL, date DATE NOT NULL, status VARCHAR(10) NOT NULL, '
+                    'remarks LONGTEXT NOT NULL, marked_by_id BIGINT NOT NULL)'
+                )
+                cursor.execute(f'DELETE FROM {_STAGING_TABLE}')
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {_STAGING_TABLE} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({columns})",
+                    [f.name]
+                )
+                cursor.execute(insert, [now, now])
+                affected = cursor.rowcount
+        finally:
+            os.unlink(f.name)
+        if on_conflict == 'update':
+            # ON DUPLICATE KEY UPDATE counts an inserted row once and an updated row twice
+            updated = affected - len(records)
+            return len(records) - updated, updated, 0
+        return affected, 0, len(records) - affected
+    return write
+
+
+def backfill_attendance(columns, rows, default_user, on_conflict='skip', batch_size=5000, workers=1, native=False,
+                        result=None, progress=None):
+    """Load attendance rows (from read_backfill_rows) in batches
+
+    Rows are validated against in-memory student and user maps; bad rows
+    are rejected (and written to the result's rejects csv writer) without
+    stopping the load. Existing records are kept (on_conflict='skip') or overwritten
+    ('update'). With several workers, each academic year is written by one
+    worker thread, so a (student, date) key is never written concurrently.
+    Model signals are not sent; call rebuild_derived() afterwards, also
+    when the load fails part way: pass in `result` to keep what was read,
+    since earlier batches stay committed. `progress(result)` is called
+    after each batch.
+    """
+    parser = _RowParser(columns, default_user)
+    result = result if result is not None else BackfillResult()
+    write = _native_writer(on_conflict) if native else _orm_writer(on_conflict)
+
+    executors = [ThreadPoolExecutor(max_workers=1) for worker in range(workers)] if workers > 1 else []
+    worker_of = {}
+    buffers = {}
+    pending = set()
+
+    def count(counts):
+        inserted, updated, skipped = counts
+        result.inserted += inserted
+        result.updated += updated
+        result.skipped += skipped
+        result.batches += 1
+        if progress:
+            progress(result)
+
+    def flush(year):
+        # Later rows for the same key replace earlier ones
+        records = list(buffers.pop(year).values())
+        if not executors:
+            count(write(records))
+            return
+        worker = worker_of.setdefault(year, len(worker_of) % workers)
+        pending.add(executors[worker].submit(write, records))
+        if len(pending) > 2 * workers:
+            done, still_pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending.intersection_update(still_pending)
+            for future in done:
+                count(future.result())
+
+    try:
+        for row_number, values in rows:
+            result.total_rows += 1
+            try:
+                record, class_year = parser.parse(values)
+            except ValueError as e:
+                result.reject(row_number, str(e), values)
+                continue
+            year = academic_year_of(record.date)
+            buffer = buffers.setdefault(year, {})
+            buffer[(record.student_id, record.date)] = record
+            result.students.add(record.student_id)
+            result.scopes.add((class_year, record.date.year, record.date.month))
+            result.academic_years.add(year)
+            if len(buffer) >= batch_size:
+                flush(year)
+        for year in list(buffers):
+            flush(year)
+        for future in wait(pending).done:
+            count(future.result())
+    finally:
+        # After a failure, batches not started yet are dropped
+        for future in pending:
+            future.cancel()
+        for executor in executors:
+            # Each worker thread has its own database connection
+            executor.submit(connection.close)
+            executor.shutdown(wait=True)
+    result.errors.sort()
+    return result
+
+
+def rebuild_derived(result):
+    """Bring bitmaps, running totals and report versions up to date after a backfill
+
+    Returns the academic years loaded that are already archived; those need
+    archive_attendance run again to move the new rows into the archive.
+    """
+    students = sorted(result.students)
+    for start in range(0, len(students), REBUILD_CHUNK):
+        chunk = students[start:start + REBUILD_CHUNK]
+        rebuild_bitmaps(chunk)
+        rebuild_cumulative(chunk)
+
+    scopes = set()
+    for class_year, year, month in result.scopes:
+        scopes.add(attendance_scope(class_year))
+        scopes.add(attendance_scope(class_year, year, month))
+    bump_versions(scopes)
+
+    through = archived_through()
+    return sorted(year for year in result.academic_years if through and year <= academic_year_of(through))
@@ -0,0 +1,174 @@
+from django.db import transaction
+from django.dispatch import receiver
+
+from .archive import STATUSES, academic_year_bounds, academic_year_of, attendance_values_list
+from .models import Attendance, AttendanceBitmap
+from .signals import attendance_changed
+
+
+# Enough bits for any academic year, leap day included
+BITMAP_BYTES = (366 + 7) // 8
+
+
+def day_position(day):
+    """(academic year, bit index) of a date"""
+    start_year = academic_year_of(day)
+    return start_year, (day - academic_year_bounds(start_year)[0]).days
+
+
+def _to_int(value):
+    return int.from_bytes(bytes(value), 'little')
+
+
+def _to_bytes(bits):
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+
+def set_day(bitmap, index, status):
+    """Set day `index` of an AttendanceBitmap to status (None clears it)"""
+    bit = 1 << index
+    for name in STATUSES:
+        bits = _to_int(getattr(bitmap, name))
+        bits = bits | bit if name == status else bits & ~bit
+        setattr(bitmap, name, _to_bytes(bits))
+
+
+class AttendanceHistory:
+    """A student's attendance as per-academic-year status bitmaps
+
+    Counts and streaks over any date range are popcounts and bit scans of
+    at most 366 bits per year; the Attendance table is not touched.
+    """
+
+    def __init__(self, bitmaps):
+        self.years = {
+            bitmap.academic_year: {status: _to_int(getattr(bitmap, status)) for status in STATUSES}
+            for bitmap in bitmaps
+        }
+
+    @classmethod
+    def load(cls, student):
+        return cls(AttendanceBitmap.objects.filter(student=student))
+
+    def _masked(self, start, end):
+        """(year, {status: bits within [start, end]}) for each year in range, in order"""
+        if start and end and start > end:
+            return
+        for year in sorted(self.years):
+            first_day, last_day = academic_year_bounds(year)
+            if (start and start > last_day) or (end and end < first_day):
+                continue
+            low = (start - first_day).days if start and start > first_day else 0
+            high = (end - first_day).days if end and end < last_day else (last_day - first_day).days
+            mask = (1 << (high + 1)) - (1 << low)
+            yield year, {status: bits & mask for status, bits in self.years[year].items()}
+
+    def counts(self, start=None, end=None):
+        """{status: days} within the range (open ends: all history; all zero if start > end)"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for year, statuses in self._masked(start, end):
+            for status, bits in statuses.items():
+                counts[status] += bits.bit_count()
+        return counts
+
+    def streaks(self, status='present', start=None, end=None):
+        """(current, longest) runs of consecutive marked days with `status`
+
+        Unmarked days (weekends, holidays) neither extend nor break a run.
+        (0, 0) if start > end.
+        """
+        run = longest = 0
+        for year, statuses in self._masked(start, end):
+            marked = 0
+            for bits in statuses.values():
+                marked |= bits
+            wanted = statuses[status]
+            while marked:
+                lowest = marked & -marked
+                if wanted & lowest:
+                    run += 1
+                    longest = max(longest, run)
+                else:
+                    run = 0
+                marked ^= lowest
+        return run, longest
+
+
+def update_bitmaps(keys):
+    """Bring the bitmaps of (student pk, date) pairs in line with the Attendance table
+
+    Statuses are re-read under the bitmap row locks rather than taken from
+    the change notifications, so batches committed concurrently can be
+    applied in any order.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    positions = {(student_pk, day): day_position(day) for student_pk, day in keys}
+    records = Attendance.objects.filter(
+        student_id__in={student_pk for student_pk, day in keys},
+        date__in={day for student_pk, day in keys},
+    ).order_by().values_list('student_id', 'date', 'status')
+
+    # Rows are needed for days that have a record; a deleted record (or
+    # student) never needs a new one. Read before the transaction, whose
+    # first statement must be a write so SQLite takes the write lock
+    # up front instead of failing to upgrade a read lock.
+    missing = [
+        AttendanceBitmap(student_id=student_pk, academic_year=positions[(student_pk, day)][0])
+        for student_pk, day in {key[:2] for key in records} & keys
+    ]
+
+    with transaction.atomic():
+        AttendanceBitmap.objects.bulk_create(missing, ignore_conflicts=True)
+        bitmaps = {
+            (bitmap.student_id, bitmap.academic_year): bitmap
+            for bitmap in AttendanceBitmap.objects.select_for_update().filter(
+                student_id__in={student_pk for student_pk, day in keys},
+                academic_year__in={year for year, index in positions.values()},
+            )
+        }
+        # A fresh query: what is committed now that the rows are locked
+        current = {(student_pk, day): status for student_pk, day, status in records.all()}
+
+        changed = {}
+        for (student_pk, day), (year, index) in positions.items():
+            bitmap = bitmaps.get((student_pk, year))
+            if bitmap is not None:
+                set_day(bitmap, index, current.get((student_pk, day)))
+                changed[bitmap.pk] = bitmap
+        AttendanceBitmap.objects.bulk_update(changed.values(), STATUSES)
+
+
+def rebuild_bitmaps(students=None, batch_size=1000):
+    """Recompute bitmaps from live and archived attendance; returns rows written"""
+    filters = {'student__in': students} if students is not None else {}
+    rows = attendance_values_list(['student_id', 'date', 'status'], **filters)
+
+    bitmaps = {}
+    for student_pk, day, status in rows.iterator(chunk_size=5000):
+        year, index = day_position(day)
+        bits = bitmaps.setdefault((student_pk, year), dict.fromkeys(STATUSES, 0))
+        bits[status] |= 1 << index
+
+    with transaction.atomic():
+        existing = AttendanceBitmap.objects.all()
+        if students is not None:
+            existing = existing.filter(student__in=students)
+        existing.delete()
+        AttendanceBitmap.objects.bulk_create(
+            [
+                AttendanceBitmap(
+                    student_id=student_pk, academic_year=year,
+                    **{status: _to_bytes(value) for status, value in bits.items()},
+                )
+                for (student_pk, year), bits in bitmaps.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(bitmaps)
+
+
+@receiver(attendance_changed)
+def attendance_bitmaps_changed(sender, changes, **kwargs):
+    update_bitmaps((change.student_id, change.date) for change in changes)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.dispatch import receiver
+
+from core.models import Student
+from .archive import STATUSES, attendance_values_list
+from .models import AttendanceCumulative
+from .signals import attendance_changed
+
+
+def _totals_as_of(students, day):
+    """{student pk: {status: total}} through `day` (None: all history)
+
+    One index lookup per student for each status, against the latest
+    cumulative row on or before the day.
+    """
+    latest = AttendanceCumulative.objects.filter(student=OuterRef('pk')).order_by('-date')
+    if day is not None:
+        latest = latest.filter(date__lte=day)
+    rows = students.order_by().annotate(**{
+        f'cumulative_{status}': Subquery(latest.values(status)[:1]) for status in STATUSES
+    }).values_list('pk', *(f'cumulative_{status}' for status in STATUSES))
+    return {
+        student_pk: dict(zip(STATUSES, totals))
+        for student_pk, *totals in rows
+        if totals[0] is not None
+    }
+
+
+def range_counts(students, start=None, end=None):
+    """{student pk: {status: count}} within the range, archive included
+
+    The difference of two lookups per student, whatever the range covers.
+    Students with no attendance through `end` are left out.
+    """
+    counts = _totals_as_of(students, end)
+    if start is not None and counts:
+        before = _totals_as_of(students, start - timedelta(days=1))
+        for student_pk, totals in before.items():
+            for status, n in totals.items():
+                counts[student_pk][status] -= n
+    return counts
+
+
+def update_cumulative(keys):
+    """Recompute the running totals of (student pk, date) pairs from each student's earliest changed date
+
+    Rows from that date on are replaced from the attendance records (one
+    per day, a live row winning over an archived copy), so concurrent and
+    out-of-order notifications settle on the committed data.
+    """
+    since = {}
+    for student_pk, day in keys:
+        since[student_pk] = min(day, since.get(student_pk, day))
+    if not since:
+        return
+    student_pks = sorted(since)
+
+    with transaction.atomic():
+        # Serializes recomputes of a student. SQLite has no row locks and
+        # one writer at a time; a read there would also keep the DELETE
+        # below from taking the write lock.
+        if connection.features.has_select_for_update:
+            list(Student.objects.select_for_update().filter(pk__in=student_pks).order_by('pk').values_list('pk'))
+
+        stale = Q()
+        for student_pk, day in since.items():
+            stale |= Q(student_id=student_pk, date__gte=day)
+        AttendanceCumulative.objects.filter(stale).delete()
+
+        # What remains ends before each student's first changed date
+        totals = _totals_as_of(Student.objects.filter(pk__in=student_pks), None)
+        records = attendance_values_list(
+            ['student_id', 'date', 'status'], min(since.values()), None, student_id__in=student_pks
+        ).order_by('student_id', 'date')
+
+        rows = []
+        for student_pk, day, status in records:
+            if day < since[student_pk]:
+                continue
+            running = totals.setdefault(student_pk, dict.fromkeys(STATUSES, 0))
+            running[status] += 1
+            rows.append(AttendanceCumulative(student_id=student_pk, date=day, **running))
+        AttendanceCumulative.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild_cumulative(students=None, batch_size=1000):
+    """Recompute running totals from live and archived attendance (live wins a shared day); returns rows written"""
+    filters = {'student__in': students} if students is not None else {}
+    records = attendance_values_list(['student_id', 'date', 'status'], **filters).order_by('student_id', 'date')
+
+    with transaction.atomic():
+        existing = AttendanceCumulative.objects.all()
+        if students is not None:
+            existing = existing.filter(student__in=students)
+        existing.delete()
+
+        written = 0
+        batch = []
+        running = None
+        current = None
+        for student_pk, day, status in records.iterator(chunk_size=5000):
+            if student_pk != current:
+                current, running = student_pk, dict.fromkeys(STATUSES, 0)
+            running[status] += 1
+            batch.append(AttendanceCumulative(student_id=student_pk, date=day, **running))
+            if len(batch) >= batch_size:
+                AttendanceCumulative.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        AttendanceCumulative.objects.bulk_create(batch)
+    return written + len(batch)
+
+
+@receiver(attendance_changed)
+def attendance_cumulative_changed(sender, changes, **kwargs):
+    update_cumulative((change.student_id, change.date) for change in changes)
@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive import academic_year_bounds, academic_year_of, archive_academic_year
+
+
+class Command(BaseCommand):
+    help = 'Move closed academic years out of the live attendance table into the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('years', nargs='*', type=int,
+                            help='Start year of each academic year to archive (e.g. 2024 for 2024/25). '
+                                 'Defaults to the academic year before the current one.')
+        parser.add_argument('--export-dir', help='Also write each year to a gzip NDJSON file in this directory')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows copied per INSERT')
+
+    def handle(self, *args, **options):
+        years = options['years'] or [academic_year_of(date.today()) - 1]
+
+        for start_year in sorted(years):
+            first_day, last_day = academic_year_bounds(start_year)
+            started = time.perf_counter()
+            try:
+                moved = archive_academic_year(start_year, options['export_dir'], options['batch_size'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"{start_year}/{start_year + 1} ({first_day} to {last_day}): "
+                f"{moved} records archived in {time.perf_counter() - started:.2f}s"
+            ))
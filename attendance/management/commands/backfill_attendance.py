@@ -0,0 +1,127 @@
+import csv
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from attendance.backfill import (
+    BackfillResult, backfill_attendance, enable_local_infile, read_backfill_rows, rebuild_derived,
+)
+
+
+# Progress lines while loading, every this many rows read
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        'Load historical attendance from a CSV file '
+        '(student_id, date, status, and optionally remarks and marked_by username)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--user', default='admin', help='marked_by for rows without one')
+        parser.add_argument('--on-conflict', choices=['skip', 'update'], default='skip',
+                            help='Keep existing records (skip) or overwrite them with the file (update)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows written per INSERT')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Writer threads; rows are split between them by academic year')
+        parser.add_argument('--native', action='store_true',
+                            help='MySQL: write with LOAD DATA LOCAL INFILE (the server needs local_infile=ON)')
+        parser.add_argument('--rejects', help='Write rejected rows, with the reason, to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        workers = max(options['workers'], 1)
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite takes one writer at a time; using a single worker.')
+            workers = 1
+        if options['native']:
+            try:
+                enable_local_infile()
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        started = time.perf_counter()
+        next_report = PROGRESS_EVERY
+
+        def progress(result):
+            nonlocal next_report
+            if result.total_rows >= next_report:
+                next_report += PROGRESS_EVERY
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{result.total_rows} rows read, {result.written} written, {result.rejected} rejected "
+                    f"({result.total_rows / elapsed:.0f} rows/s)"
+                )
+
+        rejects_file = open(options['rejects'], 'w', encoding='utf-8', newline='') if options['rejects'] else None
+        result = None
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                columns, rows = read_backfill_rows(f)
+                rejects = None
+                if rejects_file:
+                    rejects = csv.writer(rejects_file)
+                    rejects.writerow(['row', 'error', *columns])
+                result = BackfillResult(rejects)
+                backfill_attendance(
+                    columns, rows, user,
+                    on_conflict=options['on_conflict'],
+                    batch_size=options['batch_size'],
+                    workers=workers,
+                    native=options['native'],
+                    result=result,
+                    progress=progress,
+                )
+        except (OSError, ValueError, DatabaseError) as e:
+            if result is not None and result.students:
+                # Batches written before the failure stay committed
+                self.stderr.write(
+                    f"Load failed after {result.total_rows} rows; rebuilding derived data for what was read."
+                )
+                self.rebuild(result)
+            raise CommandError(str(e))
+        finally:
+            if rejects_file:
+                rejects_file.close()
+        loaded = time.perf_counter() - started
+
+        for row_number, message in result.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... and {result.rejected - len(result.errors)} more rejected row(s)")
+        self.stdout.write(
+            f"{result.total_rows} rows in {loaded:.2f}s ({result.total_rows / loaded if loaded else 0:.0f} rows/s, "
+            f"{result.batches} batches): {result.inserted} inserted, {result.updated} updated, "
+            f"{result.skipped} kept existing, {result.rejected} rejected"
+        )
+
+        self.rebuild(result)
+        self.stdout.write(self.style.SUCCESS('Backfill complete.'))
+
+    def rebuild(self, result):
+        started = time.perf_counter()
+        try:
+            archived_years = rebuild_derived(result)
+        except DatabaseError as e:
+            self.stderr.write(self.style.ERROR(
+                f"Rebuilding derived data failed ({e}). Run rebuild_attendance_bitmaps and "
+                'rebuild_attendance_cumulative; cached reports of the loaded months stay stale '
+                'until attendance in them changes.'
+            ))
+            return
+        self.stdout.write(
+            f"Bitmaps, running totals and report versions of {len(result.students)} students "
+            f"rebuilt in {time.perf_counter() - started:.2f}s"
+        )
+        if archived_years:
+            self.stdout.write(self.style.WARNING(
+                'Rows were loaded into archived academic years; run '
+                f"archive_attendance {' '.join(map(str, archived_years))} to move them to the archive."
+            ))
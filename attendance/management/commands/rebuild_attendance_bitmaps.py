@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.bitmaps import rebuild_bitmaps
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-student attendance bitmaps from live and archived attendance'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_bitmaps()
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} student-year bitmaps rebuilt in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.cumulative import rebuild_cumulative
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-student running attendance totals from live and archived attendance'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_cumulative()
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} cumulative rows rebuilt in {time.perf_counter() - started:.2f}s"
+        ))
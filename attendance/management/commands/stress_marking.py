@@ -0,0 +1,156 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from core.models import Student
+from attendance.bitmaps import AttendanceHistory
+from attendance.cumulative import range_counts
+from attendance.models import Attendance
+from attendance.services import STATUSES, save_attendance_batch
+from attendance.signals import attendance_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark the same students and date from several threads at once, then check '
+        'that every saved write bumped the record version exactly once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--batches', type=int, default=50, help='Batches per thread')
+        parser.add_argument('--students', type=int, default=40, help='Students marked (lowest pks)')
+        parser.add_argument('--date', type=date.fromisoformat, default=date(2000, 1, 3),
+                            help='Date the threads mark; its records are removed afterwards unless --keep')
+        parser.add_argument('--blind', type=float, default=0.25,
+                            help='Share of batches sent without versions (last writer wins)')
+        parser.add_argument('--think-ms', type=float, default=2.0,
+                            help='Longest pause between reading versions and saving')
+        parser.add_argument('--keep', action='store_true', help='Keep the records written')
+
+    def handle(self, *args, **options):
+        students = list(Student.objects.order_by('pk').values_list('pk', 'year')[:options['students']])
+        users = list(User.objects.filter(profile__role='teacher').order_by('pk')) or list(User.objects.order_by('pk'))
+        if not students or not users:
+            raise CommandError('Needs at least one student and one user.')
+        day = options['date']
+        if Attendance.objects.filter(date=day, student_id__in=[pk for pk, year in students]).exists() and not options['keep']:
+            raise CommandError(f'{day} already has attendance for these students; pick another --date.')
+
+        scope = Student.objects.filter(pk__in=[pk for pk, year in students])
+        initial = dict(Attendance.objects.filter(date=day, student__in=scope).values_list('student_id', 'version'))
+        lock = threading.Lock()
+        totals = Counter()
+        latencies = []
+        exceptions = Counter()
+        notified = Counter()
+
+        def collect(sender, changes, **kwargs):
+            with lock:
+                notified.update((change.student_id, change.date) for change in changes if change.date == day)
+
+        def worker(number):
+            rng = random.Random(number)
+            user = users[number % len(users)]
+            try:
+                for batch in range(options['batches']):
+                    # What a client sees when it loads the page
+                    versions = dict(Attendance.objects.filter(date=day, student__in=scope)
+                                    .values_list('student_id', 'version'))
+                    blind = rng.random() < options['blind']
+                    changes = []
+                    for pk, year in rng.sample(students, rng.randint(1, len(students))):
+                        change = {'student': pk, 'date': day.isoformat(), 'status': rng.choice(sorted(STATUSES))}
+                        if not blind:
+                            change['version'] = versions.get(pk, 0)
+                        changes.append(change)
+                    time.sleep(rng.random() * options['think_ms'] / 1000)
+
+                    started = time.perf_counter()
+                    try:
+                        result = save_attendance_batch(changes, scope, user)
+                    except DatabaseError as e:
+                        with lock:
+                            exceptions[type(e).__name__] += 1
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                        totals['batches'] += 1
+                        totals['saved'] += result.saved
+                        totals['unchanged'] += result.unchanged
+                        totals['conflicts'] += len(result.conflicts)
+                        totals['errors'] += len(result.errors)
+            finally:
+                connection.close()
+
+        attendance_changed.connect(collect)
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['threads'])]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            attendance_changed.disconnect(collect)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{connection.vendor}: {options['threads']} threads, {totals['batches']} batches in {elapsed:.2f}s "
+            f"({totals['batches'] / elapsed:.0f}/s)"
+        )
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f"batch latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+            )
+        self.stdout.write(
+            f"saved {totals['saved']}, unchanged {totals['unchanged']}, conflicts {totals['conflicts']}, "
+            f"errors {totals['errors']}, exceptions {dict(exceptions) or 0}"
+        )
+
+        # Every saved write was notified once and bumped the version once
+        # (inserts start at 1), so any difference is a lost or double write
+        records = Attendance.objects.filter(date=day, student__in=scope)
+        lost = [
+            (student_pk, version, notified[(student_pk, day)])
+            for student_pk, version in records.values_list('student_id', 'version')
+            if version - initial.get(student_pk, 0) != notified[(student_pk, day)]
+        ]
+        statuses = dict(records.values_list('student_id', 'status'))
+        stale_bitmaps = [
+            pk for pk, year in students
+            if AttendanceHistory.load(pk).counts(day, day) != {
+                status: int(statuses.get(pk) == status) for status in STATUSES
+            }
+        ]
+        day_counts = range_counts(scope, day, day)
+        stale_totals = [
+            pk for pk, year in students
+            if day_counts.get(pk, dict.fromkeys(STATUSES, 0)) != {
+                status: int(statuses.get(pk) == status) for status in STATUSES
+            }
+        ]
+
+        if not options['keep']:
+            # Model deletes, so bitmaps and report versions follow
+            for record in records:
+                record.delete()
+
+        if lost or stale_bitmaps or stale_totals or exceptions:
+            raise CommandError(
+                f'{len(lost)} record(s) with versions not matching their writes {lost[:5]}, '
+                f'{len(stale_bitmaps)} stale bitmap(s), {len(stale_totals)} stale running total(s), '
+                f'{sum(exceptions.values())} exception(s)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'No lost writes; versions, notifications, bitmaps and running totals agree.'
+        ))
@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:42
+
+from datetime import date
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_bitmaps(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceArchive = apps.get_model('attendance', 'AttendanceArchive')
+    AttendanceBitmap = apps.get_model('attendance', 'AttendanceBitmap')
+    start_month = settings.ACADEMIC_YEAR_START_MONTH
+
+    bitmaps = {}
+    for model in (Attendance, AttendanceArchive):
+        rows = model.objects.order_by().values_list('student_id', 'date', 'status')
+        for student_pk, day, status in rows.iterator(chunk_size=5000):
+            year = day.year if day.month >= start_month else day.year - 1
+            index = (day - date(year, start_month, 1)).days
+            bits = bitmaps.setdefault((student_pk, year), dict.fromkeys(['present', 'absent', 'late', 'excused'], 0))
+            bits[status] |= 1 << index
+
+    AttendanceBitmap.objects.bulk_create(
+        [
+            AttendanceBitmap(
+                student_id=student_pk, academic_year=year,
+                **{status: value.to_bytes(46, 'little') for status, value in bits.items()},
+            )
+            for (student_pk, year), bits in bitmaps.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendance_archive'),
+        ('core', '0004_student_year_graduated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')),
+                ('present', models.BinaryField(default=b'')),
+                ('absent', models.BinaryField(default=b'')),
+                ('late', models.BinaryField(default=b'')),
+                ('excused', models.BinaryField(default=b'')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='core.student')),
+            ],
+            options={
+                'ordering': ['academic_year'],
+                'unique_together': {('student', 'academic_year')},
+            },
+        ),
+        migrations.RunPython(build_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
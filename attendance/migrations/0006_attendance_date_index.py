@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendance_version'),
+        ('core', '0004_student_year_graduated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', 'student'], name='attendance_date_student_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_cumulative(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceArchive = apps.get_model('attendance', 'AttendanceArchive')
+    AttendanceCumulative = apps.get_model('attendance', 'AttendanceCumulative')
+
+    # A day marked again after its year was archived is in both tables;
+    # the live row, read last, wins
+    statuses = {}
+    for model in (AttendanceArchive, Attendance):
+        for student_pk, day, status in model.objects.order_by().values_list(
+            'student_id', 'date', 'status'
+        ).iterator(chunk_size=5000):
+            statuses[(student_pk, day)] = status
+    rows = []
+    running = {}
+    for (student_pk, day), status in sorted(statuses.items()):
+        totals = running.setdefault(student_pk, dict.fromkeys(['present', 'absent', 'late', 'excused'], 0))
+        totals[status] += 1
+        rows.append(AttendanceCumulative(student_id=student_pk, date=day, **totals))
+    AttendanceCumulative.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_attendance_date_index'),
+        ('core', '0004_student_year_graduated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceCumulative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_cumulatives', to='core.student')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('student', 'date')},
+            },
+        ),
+        migrations.RunPython(build_cumulative, migrations.RunPython.noop),
+    ]
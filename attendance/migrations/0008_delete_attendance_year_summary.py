@@ -0,0 +1,16 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_attendance_cumulative'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='AttendanceYearSummary',
+        ),
+    ]
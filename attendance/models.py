@@ -19,10 +19,17 @@ class Attendance(models.Model):
     remarks = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every write; clients send back the version they saw so
+    # concurrent marks are detected instead of silently overwritten
+    version = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         unique_together = ['student', 'date']
         ordering = ['-date', 'student__student_id']  # Changed from student__first_name to student__student_id
+        indexes = [
+            # Date ranges and newest-first listings across all students
+            models.Index(fields=['-date', 'student'], name='attendance_date_student_idx'),
+        ]
         verbose_name_plural = 'Attendance Records'
 
     def __str__(self):
@@ -39,4 +46,68 @@ class Attendance(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if not self._state.adding:
+            self.version += 1
+        super().save(*args, **kwargs)
+
+class AttendanceArchive(models.Model):
+    """Attendance of closed academic years, moved out of the live table by archive_attendance"""
+    student = models.ForeignKey('core.Student', on_delete=models.CASCADE, related_name='archived_attendances')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.STATUS_CHOICES)
+    marked_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    remarks = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['student', 'date']
+        ordering = ['-date']
+        verbose_name_plural = 'Archived Attendance Records'
+
+    def __str__(self):
+        return f"{self.student_id} - {self.date} ({self.status}, archived)"
+
+
+class AttendanceBitmap(models.Model):
+    """A student's statuses over one academic year, one bitmap per status
+
+    Bit n (little-endian) of a status field is set when the student had that
+    status on day n of the academic year. Maintained by attendance.bitmaps
+    from attendance_changed; covers archived years too.
+    """
+    student = models.ForeignKey('core.Student', on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    academic_year = models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')
+    present = models.BinaryField(default=b'')
+    absent = models.BinaryField(default=b'')
+    late = models.BinaryField(default=b'')
+    excused = models.BinaryField(default=b'')
+
+    class Meta:
+        unique_together = ['student', 'academic_year']
+        ordering = ['academic_year']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.academic_year}/{self.academic_year + 1} (bitmap)"
+
+
+class AttendanceCumulative(models.Model):
+    """A student's running status totals through a date, one row per marked day
+
+    The counts in a range are the row at or before its end minus the row
+    before its start. Maintained by attendance.cumulative from
+    attendance_changed; covers archived years too.
+    """
+    student = models.ForeignKey('core.Student', on_delete=models.CASCADE, related_name='attendance_cumulatives')
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['student', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.student_id} - through {self.date} (cumulative)"
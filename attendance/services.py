@@ -0,0 +1,234 @@
+from collections import namedtuple
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Attendance
+from .signals import AttendanceChange, notify_attendance_changed
+
+
+STATUSES = {code for code, label in Attendance.STATUS_CHOICES}
+
+
+# The parts of an Attendance row the batch compares and reports
+Record = namedtuple('Record', ['pk', 'status', 'remarks', 'version', 'marked_by_id', 'updated_at'])
+
+
+class BatchResult:
+    """Outcome of a batch
+
+    Counts of rows written and rows already up to date, (index, message)
+    errors, (index, Record or None) conflicts, and {index: version} of the
+    record after each saved or unchanged change.
+    """
+
+    def __init__(self):
+        self.saved = 0
+        self.unchanged = 0
+        self.errors = []
+        self.conflicts = []
+        self.versions = {}
+
+    def as_dict(self):
+        usernames = dict(User.objects.filter(
+            pk__in={record.marked_by_id for index, record in self.conflicts if record}
+        ).values_list('pk', 'username'))
+        return {
+            'saved': self.saved,
+            'unchanged': self.unchanged,
+            'errors': [{'index': index, 'error': message} for index, message in self.errors],
+            'conflicts': [
+                {
+                    'index': index,
+                    'status': record.status if record else None,
+                    'remarks': record.remarks if record else '',
+                    'version': record.version if record else 0,
+                    'marked_by': usernames.get(record.marked_by_id) if record else None,
+                }
+                for index, record in self.conflicts
+            ],
+            'versions': [{'index': index, 'version': version} for index, version in sorted(self.versions.items())],
+        }
+
+
+def _parse_change(change):
+    try:
+        student_pk = int(change['student'])
+        change_date = date.fromisoformat(change['date'])
+        status = change['status']
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Each change needs student, date (YYYY-MM-DD) and status.')
+    if status not in STATUSES:
+        raise ValueError(f"Invalid status '{status}'.")
+    if change_date > date.today():
+        raise ValueError('Attendance date cannot be in the future.')
+    remarks = change.get('remarks')
+    if remarks is not None and not isinstance(remarks, str):
+        raise ValueError('Remarks must be text.')
+    version = change.get('version')
+    if version is not None and (type(version) is not int or version < 0):
+        raise ValueError('Version must be a non-negative integer.')
+    return student_pk, change_date, status, remarks, version
+
+
+def _records(keys, lock=False):
+    """{(student pk, date): Record} of the existing rows among keys"""
+    rows = Attendance.objects.filter(
+        student_id__in={student_pk for student_pk, change_date in keys},
+        date__in={change_date for student_pk, change_date in keys},
+    ).order_by()
+    if lock:
+        # A locking read sees the latest committed rows, not the transaction's snapshot
+        rows = rows.select_for_update()
+    records = {}
+    for pk, student_pk, record_date, *fields in rows.values_list(
+        'pk', 'student_id', 'date', 'status', 'remarks', 'version', 'marked_by_id', 'updated_at'
+    ):
+        if (student_pk, record_date) in keys:
+            records[(student_pk, record_date)] = Record(pk, *fields)
+    return records
+
+
+def _by_value(pks_by_key, values_by_key, output_field):
+    """Case() giving each row its value, with one WHEN per distinct value"""
+    groups = {}
+    for key, value in values_by_key.items():
+        groups.setdefault(value, []).append(pks_by_key[key])
+    return Case(
+        *(When(pk__in=pks, then=Value(value)) for value, pks in groups.items()),
+        output_field=output_field,
+    )
+
+
+def save_attendance_batch(changes, students, marked_by):
+    """Upsert a batch of status changes for students in the `students` queryset
+
+    changes is a list of {'student': pk, 'date': 'YYYY-MM-DD', 'status': ...,
+    'remarks': optional, 'version': optional}. Values are absolute, so
+    replaying a batch is harmless: rows that already match are skipped.
+    Invalid changes are reported by index without affecting the rest.
+
+    Writes are optimistic. A change carrying the `version` of the record
+    its sender last saw (0: no record) is only applied if the record is
+    still at that version, or if the change agrees with the record's
+    current status and only brings new remarks. Otherwise the newer mark
+    is kept and the change is reported in `conflicts` along with it.
+    Changes without a version overwrite the record. Every change is
+    settled in a single pass: new rows are inserted with one INSERT that
+    skips existing keys, and updates are one UPDATE ... WHERE version =
+    ..., so no locks are held while the batch is worked out and nothing
+    is retried.
+    """
+    result = BatchResult()
+
+    parsed = {}
+    for index, change in enumerate(changes):
+        try:
+            student_pk, change_date, status, remarks, version = _parse_change(change)
+        except ValueError as e:
+            result.errors.append((index, str(e)))
+            continue
+        # A later change to the same student/day wins
+        parsed[(student_pk, change_date)] = (index, status, remarks, version)
+
+    class_years = dict(students.filter(
+        pk__in={student_pk for student_pk, change_date in parsed}
+    ).values_list('pk', 'year'))
+    for (student_pk, change_date), (index, status, remarks, version) in list(parsed.items()):
+        if student_pk not in class_years:
+            result.errors.append((index, 'Student not found in your class.'))
+            del parsed[(student_pk, change_date)]
+
+    if not parsed:
+        result.errors.sort()
+        return result
+
+    def settle(key, record, written_at=None):
+        """Record the outcome of the change for `key` given the row as it is now
+
+        The row was written by this batch if it carries our user and write
+        time; an identical concurrent write counts as unchanged.
+        """
+        index, status, remarks, version = wanted[key]
+        if record is not None and (record.status, record.remarks) == (status, remarks):
+            if written_at and (record.marked_by_id, record.updated_at) == (marked_by.pk, written_at):
+                result.saved += 1
+                saved.append(key)
+            else:
+                result.unchanged += 1
+            result.versions[index] = record.version
+        else:
+            result.conflicts.append((index, record))
+
+    existing = _records(parsed)
+    # wanted: key -> (index, status, remarks, version sent); updates: key ->
+    # version the UPDATE expects (None: unconditional)
+    wanted, inserts, updates, saved = {}, [], {}, []
+    for key, (index, status, remarks, version) in parsed.items():
+        record = existing.get(key)
+        if remarks is None:
+            remarks = record.remarks if record else ''
+        wanted[key] = (index, status, remarks, version)
+        if record is None:
+            inserts.append(key)
+        elif (record.status, record.remarks) == (status, remarks):
+            settle(key, record)
+        elif version is None:
+            updates[key] = None
+        elif version == record.version or status == record.status:
+            updates[key] = record.version
+        else:
+            settle(key, record)
+
+    if inserts or updates:
+        with transaction.atomic():
+            if inserts:
+                # Keys in index order, so concurrent batches take their locks in the same order
+                inserts.sort()
+                rows = [
+                    Attendance(student_id=key[0], date=key[1], status=wanted[key][1], remarks=wanted[key][2],
+                               marked_by=marked_by)
+                    for key in inserts
+                ]
+                Attendance.objects.bulk_create(rows, ignore_conflicts=True)
+                stamps = {key: row.updated_at for key, row in zip(inserts, rows)}
+                # Keys inserted concurrently by someone else were skipped
+                inserted = _records(set(inserts), lock=True)
+                for key in inserts:
+                    index, status, remarks, version = wanted[key]
+                    record = inserted.get(key)
+                    if record and version is None and (record.status, record.remarks) != (status, remarks):
+                        existing[key] = record
+                        updates[key] = None
+                    else:
+                        settle(key, record, stamps[key])
+
+            if updates:
+                pks = {key: existing[key].pk for key in updates}
+                conditions = Q()
+                for key, expected in updates.items():
+                    conditions |= Q(pk=pks[key]) if expected is None else Q(pk=pks[key], version=expected)
+                written_at = timezone.now()
+                Attendance.objects.filter(conditions).update(
+                    status=_by_value(pks, {key: wanted[key][1] for key in updates}, Attendance._meta.get_field('status')),
+                    remarks=_by_value(pks, {key: wanted[key][2] for key in updates}, Attendance._meta.get_field('remarks')),
+                    marked_by=marked_by,
+                    updated_at=written_at,
+                    version=F('version') + 1,
+                )
+                updated = _records(set(updates), lock=True)
+                for key in updates:
+                    settle(key, updated.get(key), written_at)
+
+            # bulk_create and update() skip post_save
+            notify_attendance_changed(
+                AttendanceChange(student_pk, class_years[student_pk], change_date, wanted[(student_pk, change_date)][1])
+                for student_pk, change_date in saved
+            )
+
+    result.errors.sort()
+    result.conflicts.sort(key=lambda conflict: conflict[0])
+    return result
@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Attendance
+
+
+# One written (or deleted, status=None) attendance record. class_year is the
+# student's year at write time, or None when the student wasn't loaded.
+AttendanceChange = namedtuple('AttendanceChange', ['student_id', 'class_year', 'date', 'status'])
+
+# Sent once per committed batch of attendance writes with changes=[AttendanceChange, ...]
+attendance_changed = Signal()
+
+
+class _PendingChanges:
+    """Changes collected inside a transaction, sent together on commit"""
+
+    def __init__(self):
+        self.changes = []
+
+    def send(self):
+        if getattr(connection, '_pending_attendance_changes', None) is self:
+            connection._pending_attendance_changes = None
+        attendance_changed.send(sender=Attendance, changes=self.changes)
+
+    def is_queued(self):
+        # A rolled-back transaction drops its on_commit callbacks
+        return any(entry[1] == self.send for entry in connection.run_on_commit)
+
+
+def notify_attendance_changed(changes):
+    """Announce attendance writes, batched per transaction
+
+    Bulk write paths (queryset.update, bulk_create) bypass model signals and
+    must call this themselves.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    if not connection.in_atomic_block:
+        attendance_changed.send(sender=Attendance, changes=changes)
+        return
+
+    pending = getattr(connection, '_pending_attendance_changes', None)
+    if pending is None or not pending.is_queued():
+        pending = connection._pending_attendance_changes = _PendingChanges()
+        transaction.on_commit(pending.send)
+    pending.changes.extend(changes)
+
+
+def _class_year(instance):
+    if Attendance.student.is_cached(instance):
+        return instance.student.year
+    return None
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, **kwargs):
+    notify_attendance_changed([
+        AttendanceChange(instance.student_id, _class_year(instance), instance.date, instance.status)
+    ])
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    notify_attendance_changed([
+        AttendanceChange(instance.student_id, _class_year(instance), instance.date, None)
+    ])
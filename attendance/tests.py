@@ -1,3 +1,200 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Student
+from .archive import archive_academic_year, attendance_values_list
+from .cumulative import range_counts, rebuild_cumulative
+from .models import Attendance, AttendanceCumulative
+from .services import save_attendance_batch
+from .signals import attendance_changed
+
+
+class RemarkArchivedDayTests(TestCase):
+    """A day marked again after its academic year was archived is in both tables"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('teacher', password='x')
+        self.student = Student.objects.create(student_id='S001', first_name='Asha', last_name='Rao', year='1')
+        self.students = Student.objects.filter(pk=self.student.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (2, 3, 4):
+                Attendance.objects.create(
+                    student=self.student, date=date(2023, 10, day), status='present', marked_by=self.user
+                )
+        archive_academic_year(2023)
+
+    def remark(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = save_attendance_batch(
+                [{'student': self.student.pk, 'date': '2023-10-02', 'status': 'absent'}], self.students, self.user
+            )
+        self.assertEqual(result.saved, 1)
+
+    def test_live_row_wins(self):
+        self.remark()
+        rows = attendance_values_list(['date', 'status'], date(2023, 10, 1), date(2023, 10, 31), student=self.student)
+        self.assertEqual(sorted(rows), [
+            (date(2023, 10, 2), 'absent'), (date(2023, 10, 3), 'present'), (date(2023, 10, 4), 'present'),
+        ])
+
+    def test_running_totals(self):
+        self.remark()
+        expected = {self.student.pk: {'present': 2, 'absent': 1, 'late': 0, 'excused': 0}}
+        self.assertEqual(range_counts(self.students, date(2023, 10, 1), date(2023, 10, 31)), expected)
+        self.assertEqual(AttendanceCumulative.objects.filter(student=self.student).count(), 3)
+
+        rebuild_cumulative()
+        self.assertEqual(range_counts(self.students, date(2023, 10, 1), date(2023, 10, 31)), expected)
+
+
+class SaveAttendanceBatchTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        self.student = Student.objects.create(student_id='S001', first_name='Asha', last_name='Rao', year='1')
+        self.outsider = Student.objects.create(student_id='S002', first_name='Ravi', last_name='Iyer', year='2')
+        self.students = Student.objects.filter(pk=self.student.pk)
+        self.day = date.today().isoformat()
+
+    def save(self, *changes, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return save_attendance_batch(list(changes), self.students, user or self.teacher)
+
+    def change(self, status, **fields):
+        return {'student': self.student.pk, 'date': self.day, 'status': status, **fields}
+
+    def record(self):
+        return Attendance.objects.get(student=self.student)
+
+    def test_insert_and_replay(self):
+        result = self.save(self.change('present', version=0))
+        self.assertEqual((result.saved, result.unchanged), (1, 0))
+        self.assertEqual(result.versions, {0: 1})
+
+        replay = self.save(self.change('present', version=0))
+        self.assertEqual((replay.saved, replay.unchanged, replay.conflicts), (0, 1, []))
+        self.assertEqual(self.record().version, 1)
+
+    def test_stale_version_conflicts(self):
+        self.save(self.change('present', version=0))
+        self.save(self.change('absent', version=1), user=self.other)
+
+        result = self.save(self.change('late', version=1))
+        self.assertEqual(result.saved, 0)
+        [(index, record)] = result.conflicts
+        self.assertEqual((index, record.status, record.version, record.marked_by_id), (0, 'absent', 2, self.other.pk))
+        self.assertEqual(result.as_dict()['conflicts'][0]['marked_by'], 'other')
+        self.assertEqual(self.record().status, 'absent')
+
+    def test_stale_version_with_same_status_keeps_remarks(self):
+        self.save(self.change('absent', version=0))
+        self.save(self.change('absent', remarks='Sick', version=1), user=self.other)
+
+        result = self.save(self.change('absent', remarks='Doctor visit', version=1))
+        self.assertEqual((result.saved, result.conflicts), (1, []))
+        self.assertEqual((self.record().remarks, self.record().version), ('Doctor visit', 3))
+
+    def test_blind_write_overwrites(self):
+        self.save(self.change('present', version=0))
+        self.save(self.change('absent', version=1), user=self.other)
+
+        result = self.save(self.change('late'))
+        self.assertEqual((result.saved, result.conflicts), (1, []))
+        self.assertEqual((self.record().status, self.record().version), ('late', 3))
+
+    def test_later_change_to_the_same_day_wins(self):
+        result = self.save(self.change('present'), self.change('absent'))
+        self.assertEqual(result.saved, 1)
+        self.assertEqual(self.record().status, 'absent')
+
+    def test_errors_by_index(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        result = self.save(
+            self.change('present'),
+            self.change('asleep'),
+            {'student': self.student.pk, 'date': tomorrow, 'status': 'present'},
+            {'student': self.outsider.pk, 'date': self.day, 'status': 'present'},
+            {'student': self.student.pk},
+            self.change('present', version=-1),
+        )
+        self.assertEqual(result.saved, 1)
+        self.assertEqual([index for index, message in result.errors], [1, 2, 3, 4, 5])
+        self.assertFalse(Attendance.objects.filter(student=self.outsider).exists())
+
+    def test_notifies_once_per_batch(self):
+        batches = []
+
+        def collect(sender, changes, **kwargs):
+            batches.append(sorted(change.status for change in changes))
+
+        attendance_changed.connect(collect)
+        try:
+            self.save(self.change('present'))
+            self.save(self.change('present'))
+        finally:
+            attendance_changed.disconnect(collect)
+        # The unchanged replay writes nothing and announces nothing
+        self.assertEqual(batches, [['present']])
+
+
+class ConcurrentBatchTests(TransactionTestCase):
+    """Racing writers of the same day: exactly one versioned write wins"""
+
+    THREADS = 6
+
+    def setUp(self):
+        self.teachers = [User.objects.create_user(f'teacher{n}', password='x') for n in range(self.THREADS)]
+        self.student = Student.objects.create(student_id='S001', first_name='Asha', last_name='Rao', year='1')
+        self.students = Student.objects.filter(pk=self.student.pk)
+        self.day = date.today().isoformat()
+
+    def race(self, status_of, version):
+        barrier = threading.Barrier(self.THREADS)
+        results, failures = [None] * self.THREADS, []
+
+        def run(n):
+            try:
+                barrier.wait()
+                results[n] = save_attendance_batch(
+                    [{'student': self.student.pk, 'date': self.day, 'status': status_of(n), 'version': version}],
+                    self.students, self.teachers[n],
+                )
+            except Exception as e:
+                failures.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        return results
+
+    def test_first_marks(self):
+        results = self.race(lambda n: 'present' if n % 2 else 'absent', 0)
+        record = Attendance.objects.get(student=self.student)
+        self.assertEqual(record.version, 1)
+        winners = [result for result in results if result.saved]
+        self.assertEqual(len(winners), 1)
+        for result in results:
+            # Losers either agree with the winner or are told about it
+            self.assertEqual(result.saved + result.unchanged + len(result.conflicts), 1)
+            for index, conflict in result.conflicts:
+                self.assertEqual(conflict.status, record.status)
+
+    def test_updates_from_the_same_version(self):
+        Attendance.objects.create(student=self.student, date=date.today(), status='present', marked_by=self.teachers[0])
+        statuses = ['absent', 'late', 'excused']
+        results = self.race(lambda n: statuses[n % 3], 1)
+        record = Attendance.objects.get(student=self.student)
+        self.assertEqual(record.version, 2)
+        self.assertEqual(sum(result.saved for result in results), 1)
+        self.assertEqual(record.marked_by_id, next(
+            teacher.pk for teacher, result in zip(self.teachers, results) if result.saved
+        ))
@@ -4,6 +4,7 @@ from django.contrib import messages
 from datetime import date
 from core.models import Student, Profile
 from .models import Attendance
+from .services import save_attendance_batch
 
 
 @login_required
@@ -47,26 +48,23 @@ def mark_attendance(request):
             existing_attendance[record.student.id] = record.status
 
     if request.method == 'POST':
-        success_count = 0
-
+        changes = []
         for student in students:
             status_key = f"status_{student.id}"
             remarks_key = f"remarks_{student.id}"
 
-            status = request.POST.get(status_key, 'present')
-            remarks = request.POST.get(remarks_key, '')
-
-            attendance, created = Attendance.objects.update_or_create(
-                student=student,
-                date=attendance_date,
-                defaults={
-                    'status': status,
-                    'marked_by': request.user,
-                    'remarks': remarks
-                }
-            )
-
-            success_count += 1
+            changes.append({
+                'student': student.id,
+                'date': attendance_date.isoformat(),
+                'status': request.POST.get(status_key, 'present'),
+                'remarks': request.POST.get(remarks_key, ''),
+            })
+
+        # One INSERT and one UPDATE for the class instead of update_or_create per student
+        result = save_attendance_batch(changes, students, request.user)
+        success_count = result.saved + result.unchanged
+        for index, error in result.errors:
+            messages.error(request, error)
 
         if success_count > 0:
             year_name = dict(Student.YEAR_CHOICES).get(profile.assigned_year, 'Unknown')
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'crispy_forms',
     'crispy_bootstrap5',
     'core',
@@ -34,10 +35,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,22 +66,185 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'attendance_system.wsgi.application'
 
-# MySQL Database Configuration
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'attendance_db',
-        'USER': 'root',
-        'PASSWORD': 'robin12mysql',
-        'HOST': 'localhost',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-            'charset': 'utf8mb4',
+# Database Configuration
+# MySQL by default; DB_ENGINE=sqlite uses a local db.sqlite3 for testing.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql')
+
+# Seconds a connection is reused across requests (0 = reconnect every request,
+# "none" = never close). Reused connections are pinged before each request.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '600')
+DB_CONN_MAX_AGE = None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE)
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+
+# DB_POOL=1 puts MySQL connections in a pool shared by the worker's threads
+# (requires django-db-connection-pool); the pool then owns connection reuse.
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # A file rather than shared-cache memory, where concurrent
+            # writers fail at once instead of waiting for the lock
+            # (attendance.tests.ConcurrentBatchTests)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'attendance_db'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'robin12mysql'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+                'charset': 'utf8mb4',
+            }
+        }
+    }
+
+    if DB_POOL:
+        DATABASES['default'].update({
+            'ENGINE': 'dj_db_conn_pool.backends.mysql',
+            'CONN_MAX_AGE': 0,
+            'POOL_OPTIONS': {
+                'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', '10')),
+                'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', '10')),
+                'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '3600')),
+                'PRE_PING': DB_CONN_HEALTH_CHECKS,
+            },
+        })
+
+# Optional read replica for report pages and API GETs (core.routers).
+# MySQL: set DB_REPLICA_HOST (DB_REPLICA_PORT/USER/PASSWORD default to the
+# primary's). SQLite: DB_REPLICA_NAME is a second file, refreshed from the
+# primary with manage.py sync_replica.
+if DB_ENGINE == 'sqlite':
+    if os.environ.get('DB_REPLICA_NAME'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.environ['DB_REPLICA_NAME'],
+            'TEST': {'MIRROR': 'default'},
         }
+elif os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_URL_NAMES = [
+    'attendance_reports', 'detailed_reports', 'monthly_reports', 'monthly_reports_data',
+    'student_wise_reports', 'export_report_csv', 'attendance_analytics', 'attendance_analytics_data',
+    'api_students', 'api_attendance', 'api_reports',
+]
+# Always read from the primary: logins and tokens must not lag
+REPLICA_PRIMARY_APPS = ['auth', 'authtoken', 'sessions']
+# Reads stay on the primary this long after a user's last write
+REPLICA_STICKY_COOKIE = 'primary_reads'
+REPLICA_STICKY_SECONDS = 30
+
+# Cache (template fragments, rosters). Use a shared backend such as
+# django.core.cache.backends.redis.RedisCache when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'attendance-tracker',
     }
 }
 
+# API tokens: resolved identities are cached per process for
+# API_TOKEN_CACHE_TTL seconds; tokens stop working API_TOKEN_EXPIRY seconds
+# after they were issued (None = never) and are renewed on the next login.
+API_TOKEN_CACHE_SIZE = 1024
+API_TOKEN_CACHE_TTL = 300
+API_TOKEN_EXPIRY = 60 * 60 * 24 * 30
+
+# Month the academic year starts in; closed years can be archived with
+# manage.py archive_attendance
+ACADEMIC_YEAR_START_MONTH = 7
+
+# Rendered attendance calendar rows; keys include the month's data version
+CALENDAR_ROW_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Teachers' marking rosters; dropped whenever a student changes
+ROSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Live marking progress on the HOD dashboard (core.live). The event stream
+# needs the ASGI entry point (e.g. uvicorn attendance_system.asgi:application);
+# events are published in-process, so serve it from a single process.
+LIVE_PROGRESS_KEEPALIVE_SECONDS = 15
+# Events held for a slow client before it is sent a fresh snapshot instead
+LIVE_PROGRESS_QUEUE_SIZE = 100
+
+# Admin changelists without filters show the database's row estimate
+# instead of an exact COUNT(*) once a table is this large (MySQL/PostgreSQL)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Response compression (core.middleware.CompressionMiddleware). Brotli is
+# used when the brotli package is installed. Higher levels trade CPU for
+# smaller pages; compare with manage.py benchmark_compression
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# On-demand request profiles (?__profile=1, staff only), listed at
+# admin/profiles/. Only the newest PROFILER_KEEP captures are kept (0 = all)
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_SAMPLE_INTERVAL = 0.001
+PROFILER_KEEP = 200
+
+# Queries slower than SLOW_QUERY_THRESHOLD_MS milliseconds (unset = the
+# wrapper is not installed) are logged on 'attendance.slow_queries' with
+# their call site, and the first of each fingerprint with its EXPLAIN plan.
+# Records go to stderr, or to the SLOW_QUERY_LOG file when that is set;
+# rank a file with manage.py slow_queries
+SLOW_QUERY_THRESHOLD_MS = os.environ.get('SLOW_QUERY_THRESHOLD_MS')
+SLOW_QUERY_THRESHOLD_MS = float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        } if SLOW_QUERY_LOG else {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'attendance.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -103,6 +270,35 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'core.assets.BundleFinder',
+]
+
+# collectstatic writes content-hashed names plus .gz/.br copies; templates
+# reference bundles with {% bundle 'name' %} from core/templatetags/assets.py
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Minified bundles: output name -> source files, concatenated in order
+ASSET_BUNDLES = {
+    'attendance.js': ['js/attendance.js'],
+    'dashboard.js': ['js/dashboard.js'],
+    'reports.js': ['js/report.js'],
+}
+ASSET_BUILD_DIR = BASE_DIR / '.bundles'
+
+# Serve STATIC_ROOT from Django (far-future caching, precompressed files)
+# when no web server sits in front of it
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '0') == '1'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
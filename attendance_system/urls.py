@@ -1,10 +1,22 @@
 ﻿# attendance_system/urls.py - CORRECT VERSION
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core import views as core_views
+from core.assets import serve_static
 
 urlpatterns = [
+    # Before admin/ so the admin's catch-all doesn't swallow it
+    path('admin/profiles/', core_views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:profile_id>.<str:extension>', core_views.profile_download, name='profile_download'),
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
     path('attendance/', include('attendance.urls')),
     path('api/', include('api.urls')),
-]
\ No newline at end of file
+]
+
+if settings.SERVE_STATIC:
+    urlpatterns.append(
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static)
+    )
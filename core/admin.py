@@ -1,5 +1,12 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from .admin_utils import EstimatedCountPaginator, teacher_list_filter
 from .models import Profile, Student
+from .versions import bump_students
 
 
 @admin.register(Profile)
@@ -10,13 +17,43 @@ class ProfileAdmin(admin.ModelAdmin):
     ordering = ('role', 'user__username')
 
 
+class ReassignTeacherForm(forms.Form):
+    class_teacher = forms.ModelChoiceField(
+        queryset=User.objects.filter(profile__role__in=['teacher', 'hod']).order_by('username'),
+        required=False,
+        empty_label='No class teacher',
+    )
+
+
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('student_id', 'first_name', 'last_name', 'year', 'class_teacher', 'created_at')
-    list_filter = ('year', 'class_teacher')
+    list_filter = ('year', teacher_list_filter('class_teacher', 'class teacher'))
     search_fields = ('student_id', 'first_name', 'last_name', 'email', 'phone')
     ordering = ('year', 'first_name', 'last_name')
-
+    autocomplete_fields = ('class_teacher',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('reassign_teacher',)
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('class_teacher')
\ No newline at end of file
+        return super().get_queryset(request).select_related('class_teacher')
+
+    @admin.action(description='Reassign class teacher of selected students')
+    def reassign_teacher(self, request, queryset):
+        form = ReassignTeacherForm(request.POST if 'apply' in request.POST else None)
+        if not form.is_valid():
+            return TemplateResponse(request, 'admin/core/student/reassign_teacher.html', {
+                **self.admin_site.each_context(request),
+                'title': 'Reassign class teacher',
+                'opts': self.model._meta,
+                'form': form,
+                'count': queryset.count(),
+                'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+                'select_across': request.POST.get('select_across') == '1',
+            })
+
+        # One UPDATE; update() skips post_save, so rosters and report versions are bumped here
+        updated = queryset.update(class_teacher=form.cleaned_data['class_teacher'], updated_at=timezone.now())
+        bump_students()
+        self.message_user(request, f'Class teacher reassigned for {updated} student(s).', messages.SUCCESS)
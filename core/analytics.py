@@ -0,0 +1,137 @@
+from itertools import accumulate
+from datetime import timedelta
+
+from django.db.models import Max, Min
+
+from attendance.archive import attendance_values_list
+from attendance.models import Attendance, AttendanceArchive
+
+
+# Matrix cell values: 0 for "no record", then one code per attendance status
+NO_RECORD = 0
+STATUS_INDEX = {status: code for code, (status, label) in enumerate(Attendance.STATUS_CHOICES, start=1)}
+
+
+def percentage(part, total):
+    return round(part / total * 100, 2) if total > 0 else 0
+
+
+class AttendanceMatrix:
+    """Attendance of a set of students as int8 status codes indexed by [student, day]
+
+    Cells live row-major in a single bytearray (one byte per student-day), so
+    per-student and per-day figures are bytes.count()/slicing calls running in
+    C rather than Python loops over model instances. Columns are calendar days
+    from start to end; days without any record are not school days.
+    """
+
+    def __init__(self, student_ids, start, end):
+        self.student_ids = list(student_ids)
+        self.index = {pk: i for i, pk in enumerate(self.student_ids)}
+        self.start = start
+        self.n_days = (end - start).days + 1 if start and end and end >= start else 0
+        self.cells = bytearray(len(self.student_ids) * self.n_days)
+
+    @classmethod
+    def load(cls, students, start=None, end=None, student_ids=None):
+        """Build from one stream of (student, date, status) tuples
+
+        Without start/end the range spans the students' first to last record,
+        archive included. Pass student_ids when the caller already fetched
+        them (sets row order).
+        """
+        if start is None or end is None:
+            bounds = [
+                model.objects.filter(student__in=students).aggregate(first=Min('date'), last=Max('date'))
+                for model in (Attendance, AttendanceArchive)
+            ]
+            start = start or min((b['first'] for b in bounds if b['first']), default=None)
+            end = end or max((b['last'] for b in bounds if b['last']), default=None)
+        if student_ids is None:
+            student_ids = students.values_list('id', flat=True)
+
+        matrix = cls(student_ids, start, end)
+        if not matrix.n_days or not matrix.student_ids:
+            return matrix
+
+        n_days, index, cells = matrix.n_days, matrix.index, matrix.cells
+        records = attendance_values_list(['student_id', 'date', 'status'], start, end, student__in=students)
+        for student_pk, day_date, status in records.iterator(chunk_size=5000):
+            row = index.get(student_pk)
+            if row is not None:
+                cells[row * n_days + (day_date - start).days] = STATUS_INDEX[status]
+        return matrix
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def dates(self):
+        return [self.start + timedelta(days=day) for day in range(self.n_days)]
+
+    def row(self, i):
+        return self.cells[i * self.n_days:(i + 1) * self.n_days]
+
+    def column(self, day):
+        return self.cells[day::self.n_days] if self.n_days else bytearray()
+
+    def count(self, status=None):
+        """Records with the status (any status if None) across the matrix"""
+        if status is None:
+            return len(self.cells) - self.cells.count(NO_RECORD)
+        return self.cells.count(STATUS_INDEX[status])
+
+    def student_counts(self, status=None):
+        """Per-student number of records with the status (any status if None)"""
+        n, cells = self.n_days, self.cells
+        if status is None:
+            return [n - cells.count(NO_RECORD, i * n, (i + 1) * n) for i in range(len(self))]
+        code = STATUS_INDEX[status]
+        return [cells.count(code, i * n, (i + 1) * n) for i in range(len(self))]
+
+    def day_counts(self, status=None):
+        """Per-day number of records with the status (any status if None)"""
+        columns = [self.column(day) for day in range(self.n_days)]
+        if status is None:
+            return [len(column) - column.count(NO_RECORD) for column in columns]
+        code = STATUS_INDEX[status]
+        return [column.count(code) for column in columns]
+
+    def student_rates(self, status='present'):
+        return list(map(percentage, self.student_counts(status), self.student_counts()))
+
+    def day_rates(self, status='present'):
+        return list(map(percentage, self.day_counts(status), self.day_counts()))
+
+    def school_days(self):
+        """Indexes of days on which any student has a record"""
+        return [day for day, total in enumerate(self.day_counts()) if total]
+
+    def streaks(self, status='present'):
+        """Per-student (longest, current) runs of the status over recorded days"""
+        code = STATUS_INDEX[status]
+        # Map the status to 1 and every other code to 0 so runs split on 0
+        only_status = bytes(1 if value == code else 0 for value in range(256))
+        result = []
+        for i in range(len(self)):
+            runs = self.row(i).replace(bytes([NO_RECORD]), b'').translate(only_status).split(b'\x00')
+            result.append((max(map(len, runs)), len(runs[-1])))
+        return result
+
+    def rolling_rates(self, window, status='present'):
+        """(date, rate) over the trailing `window` school days, for each school day"""
+        day_matching, day_totals = self.day_counts(status), self.day_counts()
+        days = [day for day, total in enumerate(day_totals) if total]
+        matching = [day_matching[day] for day in days]
+        totals = [day_totals[day] for day in days]
+        matching_sums = [0, *accumulate(matching)]
+        total_sums = [0, *accumulate(totals)]
+        return [
+            (
+                self.start + timedelta(days=day),
+                percentage(
+                    matching_sums[i + 1] - matching_sums[max(0, i + 1 - window)],
+                    total_sums[i + 1] - total_sums[max(0, i + 1 - window)],
+                ),
+            )
+            for i, day in enumerate(days)
+        ]
@@ -0,0 +1,274 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+BUNDLE_PREFIX = 'bundles'
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.txt', '.map', '.html')
+
+# Names ManifestStaticFilesStorage gives hashed copies: name.<12 hex chars>.ext
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+# After these characters (or keywords) a "/" starts a regular expression, not a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else'}
+_WORD_RE = re.compile(r'[\w$]+')
+
+
+def _skip_string(source, i):
+    quote, end = source[i], i + 1
+    while end < len(source) and source[end] != quote:
+        end += 2 if source[end] == '\\' else 1
+    return end + 1
+
+
+def _skip_template(source, i):
+    end = i + 1
+    while end < len(source) and source[end] != '`':
+        if source[end] == '\\':
+            end += 2
+        elif source.startswith('${', end):
+            end = _skip_braces(source, end + 2)
+        else:
+            end += 1
+    return end + 1
+
+
+def _skip_braces(source, i):
+    depth = 1
+    while i < len(source) and depth:
+        char = source[i]
+        if char in '\'"':
+            i = _skip_string(source, i)
+            continue
+        if char == '`':
+            i = _skip_template(source, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    end, in_class = i + 1, False
+    while end < len(source) and (in_class or source[end] != '/') and source[end] != '\n':
+        if source[end] == '\\':
+            end += 1
+        elif source[end] == '[':
+            in_class = True
+        elif source[end] == ']':
+            in_class = False
+        end += 1
+    return end + 1
+
+
+def minify_js(source):
+    """Strip comments and indentation from JavaScript
+
+    Deliberately conservative: line breaks are kept, so code relying on
+    automatic semicolon insertion behaves exactly as before. Strings,
+    template literals and regular expressions are copied untouched.
+    """
+    out = []
+    i, n = 0, len(source)
+    last_token = ''
+    while i < n:
+        char = source[i]
+        following = source[i + 1] if i + 1 < n else ''
+
+        if char in '\'"`' or (char == '/' and following not in '/*' and (
+                last_token in _REGEX_PRECEDERS or last_token in _REGEX_KEYWORDS or not last_token)):
+            if char == '`':
+                end = _skip_template(source, i)
+            elif char == '/':
+                end = _skip_regex(source, i)
+            else:
+                end = _skip_string(source, i)
+            out.append(source[i:end])
+            last_token = char
+            i = end
+        elif char == '/' and following == '/':
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif char == '/' and following == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            if out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+        elif char.isspace():
+            end = i
+            while end < n and source[end].isspace():
+                end += 1
+            newline = '\n' in source[i:end]
+            i = end
+            while out and out[-1] == ' ':
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n' if newline else ' ')
+        else:
+            match = _WORD_RE.match(source, i)
+            token = match.group() if match else char
+            out.append(token)
+            last_token = token
+            i += len(token)
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace in CSS"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+def build_bundle(name):
+    """Concatenated, minified contents of the ASSET_BUNDLES entry `name`"""
+    parts = []
+    for source_name in settings.ASSET_BUNDLES[name]:
+        path = finders.find(source_name)
+        if path is None:
+            raise FileNotFoundError(f"Bundle '{name}': static file '{source_name}' not found")
+        with open(path, encoding='utf-8-sig') as f:
+            parts.append(f.read())
+
+    if name.endswith('.css'):
+        return ''.join(minify_css(part) for part in parts)
+    # Each script ends with a newline (and ";" guards against a missing trailing semicolon)
+    return ';\n'.join(minify_js(part) for part in parts)
+
+
+def bundle_path(name):
+    return posixpath.join(BUNDLE_PREFIX, name)
+
+
+class BundleFinder(BaseFinder):
+    """Serves and collects the ASSET_BUNDLES as static/bundles/<name>
+
+    Bundles are written to ASSET_BUILD_DIR and rebuilt whenever a source
+    file is newer, so runserver and collectstatic see the same output.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = FileSystemStorage(location=settings.ASSET_BUILD_DIR)
+
+    def check(self, **kwargs):
+        return []
+
+    def find(self, path, find_all=False, **kwargs):
+        prefix = BUNDLE_PREFIX + '/'
+        if not path.startswith(prefix) or path[len(prefix):] not in settings.ASSET_BUNDLES:
+            return [] if find_all else None
+        built = self._build(path[len(prefix):])
+        return [built] if find_all else built
+
+    def list(self, ignore_patterns):
+        for name in settings.ASSET_BUNDLES:
+            self._build(name)
+            yield bundle_path(name), self.storage
+
+    def _build(self, name):
+        target = self.storage.path(bundle_path(name))
+        sources = [finders.find(source_name) for source_name in settings.ASSET_BUNDLES[name]]
+        if os.path.exists(target) and all(
+            source and os.path.getmtime(source) <= os.path.getmtime(target) for source in sources
+        ):
+            return target
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(build_bundle(name))
+        return target
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes .gz (and .br, with brotli installed)
+    copies of text files next to each hashed file"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name, hashed_name in self.hashed_files.items():
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._compress(self.path(name))
+                self._compress(self.path(hashed_name))
+
+    def _compress(self, path):
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        compressed = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['.br'] = brotli.compress(content, quality=11)
+
+        for suffix, data in compressed.items():
+            # Not worth a second request-time code path if it barely shrinks
+            if len(data) < len(content) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(data)
+
+
+def serve_static(request, path):
+    """Serve a file from STATIC_ROOT, precompressed when possible
+
+    Fingerprinted names never change content, so they are cached as
+    immutable for a year; anything else must be revalidated.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    fullpath = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(fullpath):
+        raise Http404(f"'{path}' could not be found")
+
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    encoding, served_path = None, fullpath
+    for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+        if name in accept_encoding and os.path.isfile(fullpath + suffix):
+            encoding, served_path = name, fullpath + suffix
+            break
+
+    stat = os.stat(served_path)
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    if request.headers.get('If-None-Match') == etag or (
+        'If-None-Match' not in request.headers
+        and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime)
+    ):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = stat.st_size
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Vary'] = 'Accept-Encoding'
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import Client
+
+
+def session_cookie(user):
+    """Cookie header of a real session for user
+
+    Benchmarks send it with WSGI requests so they go through the full
+    middleware stack, unlike the test client.
+    """
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def wsgi_get(handler, url, cookie, errors, headers=None, ok=('200',)):
+    """GET url through the WSGI handler, returning (body, response headers)
+
+    headers are extra request headers as WSGI environ keys. Raises
+    CommandError unless the status starts with one of ok. Closing the
+    response fires request_finished, which is where Django closes
+    connections older than CONN_MAX_AGE.
+    """
+    path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': errors,
+        **(headers or {}),
+    }
+    response_headers = {}
+
+    def start_response(status, header_list):
+        if not status.startswith(tuple(ok)):
+            raise CommandError(f'{url} answered {status}')
+        response_headers.update((name.lower(), value) for name, value in header_list)
+
+    response = handler(environ, start_response)
+    body = b''.join(response)
+    response.close()
+    return body, response_headers
@@ -0,0 +1,169 @@
+import io
+import json
+from datetime import date
+from itertools import islice
+
+from attendance.archive import attendance_values_list
+from attendance.cumulative import range_counts
+from .analytics import percentage
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Rows per record batch (and per Parquet row group)
+BATCH_SIZE = 10000
+
+# (column, arrow type) of each report; the first DETAILED_FIELDS map 1:1
+DETAILED_COLUMNS = [
+    ('student_id', 'string'),
+    ('first_name', 'string'),
+    ('last_name', 'string'),
+    ('year', 'string'),
+    ('teacher', 'string'),
+    ('date', 'date32'),
+    ('status', 'string'),
+    ('remarks', 'string'),
+    ('marked_by', 'string'),
+]
+DETAILED_FIELDS = [
+    'student__student_id', 'student__first_name', 'student__last_name', 'student__year',
+    'student__class_teacher__username', 'date', 'status', 'remarks', 'marked_by__username',
+]
+SUMMARY_COLUMNS = [
+    ('student_id', 'string'),
+    ('first_name', 'string'),
+    ('last_name', 'string'),
+    ('year', 'string'),
+    ('teacher', 'string'),
+    ('total_days', 'int32'),
+    ('present', 'int32'),
+    ('absent', 'int32'),
+    ('late', 'int32'),
+    ('excused', 'int32'),
+    ('attendance_percentage', 'float64'),
+]
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def available_formats():
+    """Typed export formats usable here; Arrow and Parquet need pyarrow"""
+    return ['parquet', 'arrow', 'ndjson'] if pyarrow is not None else ['ndjson']
+
+
+def detailed_rows(students, start=None, end=None):
+    """DETAILED_COLUMNS tuples of the students' attendance, archive included, by date"""
+    rows = attendance_values_list(DETAILED_FIELDS, start, end, student__in=students).order_by('date')
+    return rows.iterator(chunk_size=BATCH_SIZE)
+
+
+def summary_rows(students, start=None, end=None):
+    """SUMMARY_COLUMNS tuples, one per student"""
+    student_list = list(students.select_related('class_teacher'))
+
+    # Running totals at either end of the range, archive included:
+    # two lookups per student instead of reading their attendance
+    counts = range_counts(students, start, end)
+    empty = dict.fromkeys(('present', 'absent', 'late', 'excused'), 0)
+
+    for student in student_list:
+        student_counts = counts.get(student.pk, empty)
+        total = sum(student_counts.values())
+        yield (
+            student.student_id,
+            student.first_name,
+            student.last_name,
+            student.year,
+            student.class_teacher.username if student.class_teacher else None,
+            total,
+            student_counts['present'],
+            student_counts['absent'],
+            student_counts['late'],
+            student_counts['excused'],
+            percentage(student_counts['present'], total),
+        )
+
+
+def stream_export(columns, rows, export_format):
+    """Encode row tuples as `export_format`, yielding bytes one batch at a time"""
+    if export_format == 'ndjson':
+        return _ndjson_chunks(columns, rows)
+    if export_format not in EXPORT_FORMATS or pyarrow is None:
+        raise ValueError(f"Export format '{export_format}' is not available.")
+    return _arrow_chunks(columns, rows, export_format)
+
+
+def _batches(rows):
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        yield batch
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _ndjson_chunks(columns, rows):
+    # A header line of column names, then one array per row: objects would
+    # repeat every key on every line and come out several times larger than CSV
+    encode = json.JSONEncoder(default=_json_default, separators=(',', ':')).encode
+    yield (encode([name for name, arrow_type in columns]) + '\n').encode()
+    for batch in _batches(rows):
+        yield ''.join(encode(row) + '\n' for row in batch).encode()
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file whose contents are handed out as they are written;
+    tell() keeps counting so Parquet footer offsets stay correct"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _arrow_chunks(columns, rows, export_format):
+    schema = pyarrow.schema([(name, getattr(pyarrow, arrow_type)()) for name, arrow_type in columns])
+    sink = _StreamSink()
+    if export_format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema, options=pyarrow.ipc.IpcWriteOptions(compression='zstd'))
+
+    with writer:
+        for batch in _batches(rows):
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+                schema=schema,
+            ))
+            if data := sink.take():
+                yield data
+    yield sink.take()
@@ -0,0 +1,220 @@
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import Profile, Student
+from .versions import bump_students
+
+
+IMPORT_COLUMNS = ['student_id', 'first_name', 'last_name', 'year', 'email', 'phone', 'date_of_birth', 'address']
+REQUIRED_COLUMNS = ['student_id', 'first_name', 'last_name']
+
+# Header spellings accepted besides the column names themselves
+COLUMN_ALIASES = {
+    'registration_number': 'student_id',
+    'reg_no': 'student_id',
+    'dob': 'date_of_birth',
+}
+
+YEAR_CODES = {code for code, name in Student.YEAR_CHOICES}
+YEAR_NAMES = {name.lower(): code for code, name in Student.YEAR_CHOICES}
+
+
+class ImportResult:
+    """Outcome of an import: created count and (row number, message) errors"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def _column_name(header):
+    name = str(header or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value if isinstance(value, (date, datetime)) else str(value).strip()
+
+
+def read_rows(uploaded_file):
+    """Yield (row number, {column: value}) from an uploaded CSV or XLSX file, one row at a time"""
+    name = uploaded_file.name.lower()
+    if name.endswith('.xlsx'):
+        rows = _xlsx_rows(uploaded_file)
+    elif name.endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+    else:
+        raise ValueError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('The file is empty.')
+    columns = [_column_name(value) for value in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    for row_number, values in enumerate(rows, start=2):
+        if not any(_cell(value) for value in values):
+            continue
+        yield row_number, {column: _cell(value) for column, value in zip(columns, values) if column in IMPORT_COLUMNS}
+
+
+def _xlsx_rows(uploaded_file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import requires openpyxl; upload a CSV file instead.')
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _parse_year(value):
+    value = str(value).strip()
+    if value in YEAR_CODES:
+        return value
+    return YEAR_NAMES.get(value.lower())
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _build_student(row, year, class_teacher_id):
+    """Unsaved Student for a row, or raise ValueError describing what's wrong"""
+    for column in REQUIRED_COLUMNS:
+        if not row.get(column):
+            raise ValueError(f"'{column}' is required.")
+    if year is None:
+        raise ValueError(f"Invalid year '{row.get('year', '')}'.")
+
+    student = Student(
+        student_id=str(row['student_id']),
+        first_name=str(row['first_name']),
+        last_name=str(row['last_name']),
+        year=year,
+        email=str(row.get('email', '')) or None,
+        phone=str(row.get('phone', '')),
+        address=str(row.get('address', '')),
+        class_teacher_id=class_teacher_id,
+    )
+
+    for field in ('student_id', 'first_name', 'last_name', 'phone'):
+        max_length = Student._meta.get_field(field).max_length
+        if len(getattr(student, field)) > max_length:
+            raise ValueError(f"'{field}' is longer than {max_length} characters.")
+    if student.email:
+        try:
+            validate_email(student.email)
+        except ValidationError:
+            raise ValueError(f"Invalid email '{student.email}'.")
+    if row.get('date_of_birth'):
+        try:
+            student.date_of_birth = _parse_date(row['date_of_birth'])
+        except ValueError:
+            raise ValueError(f"Invalid date of birth '{row['date_of_birth']}' (use YYYY-MM-DD).")
+    return student
+
+
+def import_student_rows(rows, user, profile, chunk_size=500):
+    """Validate and insert (row number, row) pairs in chunks
+
+    Each chunk checks existing student IDs with one IN query and is inserted
+    with a single bulk_create. Invalid rows are reported and skipped; the rest
+    of the chunk is still imported. An error reading a later chunk leaves
+    the earlier ones imported.
+    """
+    result = ImportResult()
+
+    # Teachers import into their own year; Admin/HOD rows go to the year's teacher
+    if user.is_superuser or profile.role == 'hod':
+        teachers = Profile.teachers_by_year()
+        own_year = None
+    else:
+        teachers = {}
+        own_year = str(profile.assigned_year) if profile.assigned_year else None
+        if own_year is None:
+            raise ValueError('No year assigned to you.')
+
+    seen = set()
+    rows = iter(rows)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            result.total_rows += len(chunk)
+
+            candidates = []
+            for row_number, row in chunk:
+                year = own_year or _parse_year(row.get('year', ''))
+                try:
+                    student = _build_student(row, year, user.pk if own_year else teachers.get(year))
+                except ValueError as e:
+                    result.error(row_number, str(e))
+                    continue
+                if student.student_id in seen:
+                    result.error(row_number, f"Duplicate student ID '{student.student_id}' in file.")
+                    continue
+                seen.add(student.student_id)
+                candidates.append((row_number, student))
+
+            existing = set(Student.objects.filter(
+                student_id__in=[student.student_id for row_number, student in candidates]
+            ).values_list('student_id', flat=True))
+
+            new_students = []
+            for row_number, student in candidates:
+                if student.student_id in existing:
+                    result.error(row_number, f"Student ID '{student.student_id}' already exists.")
+                else:
+                    new_students.append((row_number, student))
+
+            result.created += _insert(new_students, result)
+    finally:
+        # bulk_create skips post_save, so announce the change once here; also
+        # when a later chunk fails, since the chunks before it are committed
+        if result.created:
+            bump_students()
+
+    result.errors.sort()
+    return result
+
+
+def _insert(new_students, result):
+    try:
+        with transaction.atomic():
+            Student.objects.bulk_create([student for row_number, student in new_students])
+        return len(new_students)
+    except IntegrityError:
+        pass
+
+    # Someone added one of these IDs since the check; find out which row row by row
+    created = 0
+    for row_number, student in new_students:
+        try:
+            with transaction.atomic():
+                student.save(force_insert=True)
+            created += 1
+        except IntegrityError:
+            result.error(row_number, f"Student ID '{student.student_id}' already exists.")
+    return created
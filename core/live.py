@@ -0,0 +1,158 @@
+import asyncio
+import json
+import threading
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+from django.dispatch import receiver
+
+from attendance.models import Attendance
+from attendance.signals import attendance_changed
+from .models import Student
+
+
+STATUS_CODES = [code for code, label in Attendance.STATUS_CHOICES]
+YEAR_NAMES = dict(Student.YEAR_CHOICES)
+
+
+def _progress_row(**fields):
+    return {**fields, 'students': 0, 'marked': 0, **dict.fromkeys(STATUS_CODES, 0)}
+
+
+def marking_progress(day, years=None):
+    """Marking progress on `day` per class year and per class (year and class teacher)
+
+    {'date', 'years': [row], 'classes': [row]}; every row has 'key',
+    'students', 'marked' and a count per status. Limited to `years` when
+    given. Two aggregate queries, whatever the number of students.
+    """
+    students = Student.objects.filter(year__in=years or list(YEAR_NAMES))
+    year_rows = {}
+    class_rows = {}
+
+    def rows_for(year, teacher_pk, username):
+        year_row = year_rows.setdefault(year, _progress_row(key=year, year=year, name=YEAR_NAMES.get(year, year)))
+        class_row = class_rows.setdefault((year, teacher_pk), _progress_row(
+            key=f'{year}:{teacher_pk or 0}', year=year, name=YEAR_NAMES.get(year, year),
+            teacher=username or 'Not Assigned',
+        ))
+        return year_row, class_row
+
+    sizes = students.values_list('year', 'class_teacher', 'class_teacher__username').annotate(n=Count('id')).order_by()
+    for year, teacher_pk, username, n in sizes:
+        for row in rows_for(year, teacher_pk, username):
+            row['students'] += n
+
+    marked = Attendance.objects.filter(date=day, student__in=students).values_list(
+        'student__year', 'student__class_teacher', 'student__class_teacher__username', 'status'
+    ).annotate(n=Count('id')).order_by()
+    for year, teacher_pk, username, status, n in marked:
+        for row in rows_for(year, teacher_pk, username):
+            row['marked'] += n
+            row[status] += n
+
+    return {
+        'date': day.isoformat(),
+        'years': [year_rows[year] for year in sorted(year_rows)],
+        'classes': [class_rows[key] for key in sorted(class_rows, key=lambda key: (key[0], class_rows[key]['teacher']))],
+    }
+
+
+class ProgressBroker:
+    """In-process pub/sub for marking progress events
+
+    Subscribers are asyncio queues read by event streams; publish() can be
+    called from any thread. A subscriber that falls behind has its queue
+    emptied and gets None, meaning "send a fresh snapshot". Only the
+    process that handled a write publishes it, so streams see every write
+    with a single server process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __bool__(self):
+        return bool(self._subscribers)
+
+    def subscribe(self):
+        """A new queue of events, bound to the running event loop"""
+        queue = asyncio.Queue(maxsize=settings.LIVE_PROGRESS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {entry for entry in self._subscribers if entry[1] is not queue}
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # The loop has closed under a stream that never cleaned up
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+broker = ProgressBroker()
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+async def progress_events():
+    """Server-sent events: a snapshot, then the rows of each changed class year
+
+    A fresh snapshot follows a dropped backlog and the change of day;
+    a comment line keeps idle connections open.
+    """
+    queue = broker.subscribe()
+    try:
+        # Subscribed before the snapshot, so no write falls in between
+        day = date.today()
+        yield 'retry: 5000\n\n'
+        yield _sse('snapshot', await sync_to_async(marking_progress)(day))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.LIVE_PROGRESS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if date.today() == day:
+                    yield ': keepalive\n\n'
+                    continue
+                event = None
+            if event is None or date.today() != day:
+                day = date.today()
+                yield _sse('snapshot', await sync_to_async(marking_progress)(day))
+            elif event['date'] == day.isoformat():
+                yield _sse('progress', event)
+    finally:
+        broker.unsubscribe(queue)
+
+
+@receiver(attendance_changed)
+def attendance_progress_changed(sender, changes, **kwargs):
+    if not broker:
+        return
+    today = date.today()
+    todays = [change for change in changes if change.date == today]
+    if not todays:
+        return
+    years = None if any(change.class_year is None for change in todays) else {change.class_year for change in todays}
+    # Current rows of the changed years rather than increments, so a
+    # missed or reordered event never leaves a stream wrong
+    broker.publish(marking_progress(today, years and sorted(years)))
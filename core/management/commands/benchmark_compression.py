@@ -0,0 +1,97 @@
+import calendar
+import gzip
+import statistics
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import middleware
+from core.benchmarking import session_cookie, wsgi_get
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes on the wire and latency of report pages per compression setting'
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument('--url', action='append', dest='urls',
+                            help='Page to request, may be repeated '
+                                 '(default: this month\'s attendance calendar and detailed report CSV)')
+        parser.add_argument('--user', default='hod', help='Username the requests are made as')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per page and setting')
+        parser.add_argument('--gzip-levels', default='1,6,9', help='Comma separated gzip levels to compare')
+        parser.add_argument('--brotli-qualities', default='1,5,11',
+                            help='Comma separated brotli qualities to compare (needs the brotli package)')
+        parser.add_argument('--month', type=int, default=today.month, help='Report month (default: current)')
+        parser.add_argument('--year', type=int, default=today.year, help='Report year (default: current)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        month, year = options['month'], options['year']
+        last_day = calendar.monthrange(year, month)[1]
+        urls = options['urls'] or [
+            f"/attendance-reports/?month={month}&year={year}",
+            f"/reports/export-csv/?type=detailed&start_date={year}-{month:02d}-01&end_date={year}-{month:02d}-{last_day}",
+        ]
+
+        cookie = session_cookie(user)
+
+        configurations = [('identity', 'identity', {})]
+        configurations += [
+            (f'gzip level {level}', 'gzip', {'COMPRESSION_GZIP_LEVEL': int(level)})
+            for level in options['gzip_levels'].split(',')
+        ]
+        if middleware.brotli is not None:
+            configurations += [
+                (f'br quality {quality}', 'br', {'COMPRESSION_BROTLI_QUALITY': int(quality)})
+                for quality in options['brotli_qualities'].split(',')
+            ]
+        else:
+            self.stdout.write('brotli is not installed; comparing gzip only')
+
+        handler = WSGIHandler()
+        for url in urls:
+            self.stdout.write(f"\n{options['requests']} x GET {url} as {user.username}")
+            # Warm-up request so URL resolution, templates and caches aren't measured
+            self.request(handler, url, cookie, 'identity')
+
+            identity_size = None
+            for label, accept_encoding, overrides in configurations:
+                with override_settings(COMPRESSION_MIN_SIZE=0, **overrides):
+                    latencies, size, body, encoding = self.run(handler, url, cookie, accept_encoding, options['requests'])
+
+                if encoding == 'gzip':
+                    body = gzip.decompress(body)
+                elif encoding == 'br':
+                    body = middleware.brotli.decompress(body)
+                if identity_size is None:
+                    identity_size = len(body)
+                elif len(body) != identity_size:
+                    raise CommandError(f'{label}: decompressed body differs from the uncompressed one')
+
+                latencies.sort()
+                self.stdout.write(
+                    f"{label:>16}: {size:>9} bytes ({size / identity_size:6.1%}), "
+                    f"mean {statistics.mean(latencies):7.2f} ms, "
+                    f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)]:7.2f} ms"
+                )
+
+    def run(self, handler, url, cookie, accept_encoding, count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            body, encoding = self.request(handler, url, cookie, accept_encoding)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies, len(body), body, encoding
+
+    def request(self, handler, url, cookie, accept_encoding):
+        body, headers = wsgi_get(handler, url, cookie, self.stderr, {'HTTP_ACCEPT_ENCODING': accept_encoding})
+        return body, headers.get('content-encoding')
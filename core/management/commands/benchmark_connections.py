@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.benchmarking import session_cookie, wsgi_get
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency with and without persistent database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/dashboard/', help='Page to request (default: /dashboard/)')
+        parser.add_argument('--user', default='admin', help='Username the requests are made as')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--max-age', default='0,600',
+                            help='Comma separated CONN_MAX_AGE values to compare ("none" = unlimited)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        cookie = session_cookie(user)
+
+        alias = 'default'
+        engine = connections[alias].settings_dict['ENGINE']
+        self.stdout.write(f"{engine} - {options['requests']} x GET {options['url']} as {user.username}")
+
+        handler = WSGIHandler()
+        for value in options['max_age'].split(','):
+            max_age = None if value.strip().lower() == 'none' else int(value)
+            latencies, opened = self.run(handler, options['url'], cookie, options['requests'], alias, max_age)
+
+            latencies.sort()
+            self.stdout.write(
+                f"CONN_MAX_AGE={max_age}: "
+                f"mean {statistics.mean(latencies):.2f} ms, "
+                f"p50 {latencies[len(latencies) // 2]:.2f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, "
+                f"{opened} connections opened"
+            )
+
+    def run(self, handler, url, cookie, count, alias, max_age):
+        connection = connections[alias]
+        connection.close()
+        saved_max_age = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                opened.append(1)
+
+        connection_created.connect(count_connection)
+        latencies = []
+        try:
+            # Warm-up request so URL resolution and template loading aren't measured
+            wsgi_get(handler, url, cookie, self.stderr, ok=('200', '304'))
+            opened.clear()
+
+            for _ in range(count):
+                started = time.perf_counter()
+                wsgi_get(handler, url, cookie, self.stderr, ok=('200', '304'))
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count_connection)
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = saved_max_age
+        return latencies, len(opened)
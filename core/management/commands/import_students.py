@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import import_student_rows, read_rows
+from core.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Bulk import students from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row')
+        parser.add_argument('--user', default='admin',
+                            help='Import as this user (a teacher imports into their own year)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows validated and inserted per batch')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            raise CommandError(f"User '{user.username}' has no profile.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_student_rows(read_rows(File(f)), user, profile, options['chunk_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for row_number, message in result.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} of {result.total_rows} students imported in {elapsed:.2f}s "
+            f"({len(result.errors)} skipped)"
+        ))
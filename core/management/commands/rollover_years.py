@@ -0,0 +1,40 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.models import Student
+from core.rollover import rollover_plan, rollover_students
+
+
+class Command(BaseCommand):
+    help = 'Promote all students to the next year at the end of the academic year (year 4 graduates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['dry_run']:
+            plan = rollover_plan()
+        else:
+            plan = rollover_students()
+        elapsed = time.perf_counter() - started
+
+        year_names = dict(Student.ALL_YEAR_CHOICES)
+        teacher_names = dict(User.objects.filter(
+            pk__in=[teacher_id for old, new, count, teacher_id in plan if teacher_id]
+        ).values_list('pk', 'username'))
+
+        for old, new, count, teacher_id in plan:
+            if new == Student.GRADUATED:
+                teacher = 'no class teacher'
+            else:
+                teacher = f"teacher: {teacher_names.get(teacher_id, 'none assigned')}"
+            self.stdout.write(f"{year_names[old]} -> {year_names[new]}: {count} students ({teacher})")
+
+        total = sum(count for old, new, count, teacher_id in plan)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {total} students would be moved. Nothing was changed."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total} students moved in {elapsed:.2f}s"))
@@ -0,0 +1,56 @@
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rank slow query fingerprints from the slow query log by total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG,
+                            help='Log file (default SLOW_QUERY_LOG); rotated copies (.1, .2, ...) are read as well')
+        parser.add_argument('--top', type=int, default=20, help='Number of fingerprints shown')
+        parser.add_argument('--explain', action='store_true', help='Print the captured EXPLAIN plans')
+
+    def handle(self, *args, **options):
+        if not options['log']:
+            raise CommandError('No slow query log file: set SLOW_QUERY_LOG or pass --log')
+        paths = sorted(glob.glob(glob.escape(options['log']) + '*'))
+        if not paths:
+            raise CommandError(f"No slow query log at {options['log']}")
+
+        stats = {}
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    stat = stats.setdefault(entry['fingerprint'], {
+                        'sql': entry['sql'], 'count': 0, 'total': 0.0, 'max': 0.0, 'sites': {}, 'explain': None,
+                    })
+                    stat['count'] += 1
+                    stat['total'] += entry['duration_ms']
+                    stat['max'] = max(stat['max'], entry['duration_ms'])
+                    site = (entry['site'], entry.get('view', ''))
+                    stat['sites'][site] = stat['sites'].get(site, 0) + 1
+                    if entry.get('explain'):
+                        stat['explain'] = entry['explain']
+
+        ranked = sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True)
+        for key, stat in ranked[:options['top']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{key}  total {stat['total']:.0f} ms, {stat['count']} calls, "
+                f"mean {stat['total'] / stat['count']:.1f} ms, max {stat['max']:.1f} ms"
+            ))
+            self.stdout.write(f"  {stat['sql'][:300]}")
+            for (site, view), count in sorted(stat['sites'].items(), key=lambda item: item[1], reverse=True):
+                via = f" (view {view})" if view and view != site else ''
+                self.stdout.write(f"  {count:>6} x {site or '(outside project code)'}{via}")
+            if options['explain'] and stat['explain']:
+                for row in stat['explain']:
+                    self.stdout.write(f"    {row}")
+        self.stdout.write(f"{len(stats)} fingerprints in {len(paths)} file(s)")
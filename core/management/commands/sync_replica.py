@@ -0,0 +1,32 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary database into the SQLite replica file (local replica testing)'
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE
+        if alias not in settings.DATABASES:
+            raise CommandError('No replica configured; set DB_REPLICA_NAME.')
+        primary, replica = settings.DATABASES['default'], settings.DATABASES[alias]
+        if 'sqlite' not in primary['ENGINE'] or 'sqlite' not in replica['ENGINE']:
+            raise CommandError('Only SQLite replicas are synced here; MySQL replication keeps replicas current.')
+
+        connections[alias].close()
+        started = time.perf_counter()
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            with target:
+                source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary['NAME']} to {replica['NAME']} in {time.perf_counter() - started:.2f}s"
+        ))
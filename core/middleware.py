@@ -0,0 +1,239 @@
+import gzip
+import io
+import secrets
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .profiling import profile_request
+from .routers import replica_configured, use_replica
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Text formats worth compressing; images, archives, Parquet etc. are
+# already compressed and pass through untouched
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+)
+
+# Streamed bodies are flushed to the client once this much input has
+# accumulated, instead of after every (often one CSV row) chunk
+STREAM_FLUSH_SIZE = 16 * 1024
+
+# Random gzip header padding, as GZipMiddleware adds against BREACH
+MAX_RANDOM_BYTES = 100
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, minus those with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self.buffer = io.BytesIO()
+        self.file = gzip.GzipFile(
+            filename='a' * secrets.randbelow(MAX_RANDOM_BYTES),
+            mode='wb', compresslevel=level, fileobj=self.buffer, mtime=0,
+        )
+
+    def compress(self, data, flush=False):
+        self.file.write(data)
+        if flush:
+            self.file.flush()
+        return self._take()
+
+    def finish(self):
+        self.file.close()
+        return self._take()
+
+    def _take(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class BrotliCompressor:
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data, flush=False):
+        output = self.compressor.process(data)
+        if flush:
+            output += self.compressor.flush()
+        return output
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Brotli (when installed) or gzip compression of text responses
+
+    Unlike GZipMiddleware the level is configurable
+    (COMPRESSION_GZIP_LEVEL / COMPRESSION_BROTLI_QUALITY: higher is smaller
+    but costs more CPU) and streamed responses are flushed in
+    STREAM_FLUSH_SIZE blocks, so CSV exports compress about as well as
+    buffered pages. Bodies under COMPRESSION_MIN_SIZE bytes, already
+    encoded responses and non-text content types are left alone.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 206:
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith('text/event-stream'):
+            # Events must reach the client as they are sent, not per STREAM_FLUSH_SIZE
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding, compressor = 'br', BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding, compressor = 'gzip', GzipCompressor(settings.COMPRESSION_GZIP_LEVEL)
+        else:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async_stream(compressor, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(compressor, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is no longer byte-for-byte what a strong ETag promised
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(compressor, chunks):
+        pending = 0
+        for chunk in chunks:
+            pending += len(chunk)
+            flush = pending >= STREAM_FLUSH_SIZE
+            if flush:
+                pending = 0
+            data = compressor.compress(chunk, flush=flush)
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def _compress_async_stream(compressor, chunks):
+        pending = 0
+        async for chunk in chunks:
+            pending += len(chunk)
+            flush = pending >= STREAM_FLUSH_SIZE
+            if flush:
+                pending = 0
+            data = compressor.compress(chunk, flush=flush)
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ProfilerMiddleware:
+    """Profile a single request on demand: staff add ?__profile=1 to any URL
+
+    The capture (pstats, collapsed stacks, metadata) is stored by
+    core.profiling and listed at admin/profiles/. Must come after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.GET.get('__profile') != '1' or not request.user.is_staff:
+            return self.get_response(request)
+
+        response, profile_id = profile_request(request, self.get_response)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Serve GETs of REPLICA_URL_NAMES from the read replica
+
+    After a user writes anything (a non-GET/HEAD request), a cookie keeps
+    their reads on the primary for REPLICA_STICKY_SECONDS so they see their
+    own changes despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._reads_from_replica(request):
+            response = self.get_response(request)
+            if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+                )
+            return response
+
+        with use_replica():
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            # Streamed exports query while the body is being sent
+            response.streaming_content = self._read_from_replica(response.streaming_content)
+        return response
+
+    @staticmethod
+    def _reads_from_replica(request):
+        if request.method not in ('GET', 'HEAD') or settings.REPLICA_STICKY_COOKIE in request.COOKIES:
+            return False
+        if not replica_configured():
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        return match.url_name in settings.REPLICA_URL_NAMES
+
+    @staticmethod
+    def _read_from_replica(chunks):
+        chunks = iter(chunks)
+        while True:
+            with use_replica():
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
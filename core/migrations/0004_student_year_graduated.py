@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_dataversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='year',
+            field=models.CharField(choices=[('1', 'First Year'), ('2', 'Second Year'), ('3', 'Third Year'), ('4', 'Fourth Year'), ('G', 'Graduated')], default='1', max_length=1),
+        ),
+    ]
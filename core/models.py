@@ -1,4 +1,5 @@
 ﻿from django.db import models
+from django.db.models.query import ModelIterable
 from django.contrib.auth.models import User
 from datetime import date
 
@@ -29,6 +30,45 @@ class Profile(models.Model):
             return f"{self.user.username} (Year {self.assigned_year} Teacher)"
         return f"{self.user.username} ({self.role})"
 
+    @classmethod
+    def teachers_by_year(cls):
+        """{year: user id} of the class teacher for each year (first assigned teacher wins)"""
+        teachers = {}
+        rows = cls.objects.filter(
+            role='teacher',
+            assigned_year__isnull=False
+        ).order_by('user_id').values_list('assigned_year', 'user_id')
+        for year, user_id in rows:
+            teachers.setdefault(str(year), user_id)
+        return teachers
+
+
+class DataVersion(models.Model):
+    """Change counter for a report scope, bumped whenever data in that scope is written"""
+    scope = models.CharField(max_length=32, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} (v{self.version})"
+
+
+class StudentQuerySet(models.QuerySet):
+    """Students that know the others fetched with them
+
+    Every instance from one evaluation shares the list of its peers, so a
+    per-student lookup such as get_attendance_for_date() can load the whole
+    list in one query on first use instead of one query per student.
+    """
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if fetched and self._iterable_class is ModelIterable:
+            peers = self._result_cache
+            for student in peers:
+                student._peers = peers
+
 
 class Student(models.Model):
     YEAR_CHOICES = [
@@ -38,10 +78,14 @@ class Student(models.Model):
         ('4', 'Fourth Year'),
     ]
 
+    # Set by the yearly rollover on students promoted past the final year
+    GRADUATED = 'G'
+    ALL_YEAR_CHOICES = YEAR_CHOICES + [(GRADUATED, 'Graduated')]
+
     student_id = models.CharField(max_length=20, unique=True)
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
-    year = models.CharField(max_length=1, choices=YEAR_CHOICES, default='1')
+    year = models.CharField(max_length=1, choices=ALL_YEAR_CHOICES, default='1')
     email = models.EmailField(blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
@@ -56,6 +100,8 @@ class Student(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Added missing field
 
+    objects = StudentQuerySet.as_manager()
+
     class Meta:
         ordering = ['year', 'first_name', 'last_name']
 
@@ -68,20 +114,30 @@ class Student(models.Model):
 
     def get_year_display(self):
 
-        return dict(self.YEAR_CHOICES).get(self.year, f'Year {self.year}')
+        return dict(self.ALL_YEAR_CHOICES).get(self.year, f'Year {self.year}')
 
     def get_attendance_today(self):
 
-        from attendance.models import Attendance
-        try:
-            return Attendance.objects.get(student=self, date=date.today())
-        except Attendance.DoesNotExist:
-            return None
+        return self.get_attendance_for_date(date.today())
 
     def get_attendance_for_date(self, target_date):
-
-        from attendance.models import Attendance
-        try:
-            return Attendance.objects.get(student=self, date=target_date)
-        except Attendance.DoesNotExist:
-            return None
\ No newline at end of file
+        """The student's Attendance on target_date, or None
+
+        The first call for a date loads it for every student fetched in the
+        same queryset; the results are kept on the instances.
+        """
+        loaded = self.__dict__.setdefault('_attendance_by_date', {})
+        if target_date not in loaded:
+            from attendance.models import Attendance
+            peers = [peer for peer in getattr(self, '_peers', [self]) if peer.pk is not None]
+            records = {
+                record.student_id: record
+                for record in Attendance.objects.filter(student__in=peers, date=target_date).order_by()
+            }
+            for peer in peers:
+                record = records.get(peer.pk)
+                if record is not None:
+                    record.student = peer
+                peer.__dict__.setdefault('_attendance_by_date', {})[target_date] = record
+            loaded.setdefault(target_date, None)
+        return loaded[target_date]
\ No newline at end of file
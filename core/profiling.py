@@ -0,0 +1,157 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+
+# Files of one capture: <id>.prof (pstats), <id>.collapsed (flamegraph.pl /
+# speedscope input) and <id>.json (what the admin page lists)
+PROFILE_ID_RE = re.compile(r'^[\w-]+$')
+PROFILE_EXTENSIONS = ('.prof', '.collapsed', '.json')
+
+# The switch interval is process-wide: the first active sampler lowers it
+# and the last one restores it, so overlapping profiled requests can't
+# leave the process at the sampling interval
+_switch_lock = threading.Lock()
+_samplers_active = 0
+_saved_switch_interval = None
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a
+    background thread and counts identical stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def __enter__(self):
+        global _samplers_active, _saved_switch_interval
+        # The sampler needs the GIL to take a sample; by default a busy
+        # request thread only gives it up every 5ms
+        with _switch_lock:
+            if not _samplers_active:
+                _saved_switch_interval = sys.getswitchinterval()
+            _samplers_active += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _samplers_active
+        self._stop.set()
+        self._thread.join()
+        with _switch_lock:
+            _samplers_active -= 1
+            if not _samplers_active:
+                sys.setswitchinterval(_saved_switch_interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Samples in the collapsed stack format: "outer;...;inner count" lines"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+def _short_path(filename):
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return os.path.relpath(filename, base)
+    # Library code: keep the package-relative part
+    return filename.rsplit('site-packages' + os.sep, 1)[-1]
+
+
+def profile_request(request, get_response):
+    """Run get_response(request) under cProfile and the stack sampler and
+    store the capture in PROFILER_DIR; returns (response, profile id)"""
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with StackSampler(threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL) as sampler:
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration = time.perf_counter() - started
+
+    match = request.resolver_match
+    url_name = match.view_name if match else ''
+    created = datetime.now(timezone.utc)
+    profile_id = f"{created:%Y%m%d-%H%M%S-%f}-{(url_name or 'unresolved').replace(':', '-')}-{uuid.uuid4().hex[:8]}"
+
+    directory = settings.PROFILER_DIR
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile_id)
+    profiler.dump_stats(base + '.prof')
+    with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+        f.write(sampler.collapsed())
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'id': profile_id,
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': request.user.get_username(),
+            'duration_ms': round(duration * 1000, 2),
+            'samples': sum(sampler.counts.values()),
+            'created': created.isoformat(),
+        }, f)
+
+    _prune(directory, settings.PROFILER_KEEP)
+    return response, profile_id
+
+
+def list_profiles():
+    """Metadata of the stored captures, newest first"""
+    directory = settings.PROFILER_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda profile: profile['created'], reverse=True)
+    return profiles
+
+
+def profile_file_path(profile_id, extension):
+    """Path of a stored capture file, or None for unknown or unsafe names"""
+    if not PROFILE_ID_RE.match(profile_id) or extension not in PROFILE_EXTENSIONS:
+        return None
+    path = os.path.join(settings.PROFILER_DIR, profile_id + extension)
+    return path if os.path.isfile(path) else None
+
+
+def _prune(directory, keep):
+    captures = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in captures[:-keep] if keep else []:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, profile_id + extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger('attendance.slow_queries')
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+# Frames from these files are the ORM and this module, not the caller
+_SKIP_PATH_PARTS = ('site-packages', 'dist-packages', os.sep + 'django' + os.sep, 'querylog.py')
+
+
+def normalize_sql(sql):
+    """SQL with literals replaced by ? and IN lists of any length collapsed"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:12]
+
+
+def call_site():
+    """('path:line in function', view) of the query
+
+    The first is the innermost project frame running the query, the second
+    the outermost frame in a views module (empty outside requests).
+    """
+    base = str(settings.BASE_DIR) + os.sep
+    site, view = '', ''
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and not any(part in filename for part in _SKIP_PATH_PARTS):
+            location = f'{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}'
+            site = site or location
+            if filename.endswith('views.py'):
+                view = location
+        frame = frame.f_back
+    return site, view
+
+
+class SlowQueryLogger:
+    """Execute wrapper that logs queries slower than SLOW_QUERY_THRESHOLD_MS
+
+    Records are JSON lines on the 'attendance.slow_queries' logger. The
+    first slow SELECT of each fingerprint (per process) also gets its
+    EXPLAIN plan.
+    """
+
+    def __init__(self):
+        self._explained = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, 'explaining', False):
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.record(sql, params, many, context, duration)
+
+    def record(self, sql, params, many, context, duration):
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        connection = context['connection']
+        site, view = call_site()
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'fingerprint': key,
+            'sql': normalized,
+            'duration_ms': round(duration, 2),
+            'site': site,
+            'view': view,
+            'alias': connection.alias,
+            'many': many,
+        }
+
+        with self._lock:
+            explain = settings.SLOW_QUERY_EXPLAIN and not many and key not in self._explained
+            if explain:
+                self._explained.add(key)
+        if explain and normalized.upper().startswith('SELECT'):
+            entry['explain'] = self.explain(connection, sql, params)
+
+        logger.warning(json.dumps(entry, default=str))
+
+    def explain(self, connection, sql, params):
+        self._local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+        except DatabaseError as e:
+            return [f'EXPLAIN failed: {e}']
+        finally:
+            self._local.explaining = False
+
+
+slow_query_logger = SlowQueryLogger()
+
+
+@receiver(connection_created)
+def install_slow_query_logger(sender, connection, **kwargs):
+    # connection_created fires again when a wrapper reconnects
+    if settings.SLOW_QUERY_THRESHOLD_MS is not None and slow_query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_logger)
@@ -0,0 +1,122 @@
+import calendar
+from datetime import date
+
+from django.utils.functional import cached_property
+
+from attendance.archive import attendance_values_list
+from attendance.models import Attendance
+from .analytics import AttendanceMatrix, percentage
+from .models import Student
+
+
+STATUS_CODES = [code for code, label in Attendance.STATUS_CHOICES]
+
+
+def scope_students(user, profile):
+    """Students visible to the user: everyone (graduates included) for Admin/HOD, own class for teachers"""
+    if user.is_superuser or profile.role == 'hod':
+        return Student.objects.all()
+    if profile.assigned_year:
+        return Student.objects.filter(year=profile.assigned_year, class_teacher=user)
+    return Student.objects.none()
+
+
+def month_bounds(year, month):
+    """First and last day of a month, for index-friendly date range filters"""
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def monthly_summary(students, year, month):
+    """Per-student status counts for a month as columnar arrays"""
+    first_day, last_day = month_bounds(year, month)
+
+    rows = students.values_list('id', 'student_id', 'first_name', 'last_name', 'year')
+    ids, student_ids, first_names, last_names, years = map(list, zip(*rows)) if rows else ([],) * 5
+    matrix = AttendanceMatrix.load(students, first_day, last_day, student_ids=ids)
+
+    columns = {
+        'id': ids,
+        'student_id': student_ids,
+        'name': [f"{first_name} {last_name}" for first_name, last_name in zip(first_names, last_names)],
+        'year': years,
+        'total': matrix.student_counts(),
+    }
+    for status in STATUS_CODES:
+        columns[status] = matrix.student_counts(status)
+    columns['percentage'] = list(map(percentage, columns['present'], columns['total']))
+
+    total_students = len(ids)
+    summary = {
+        'total_students': total_students,
+        'avg_attendance': round(sum(columns['percentage']) / total_students, 2) if total_students else 0,
+        'overall_percentage': percentage(matrix.count('present'), matrix.count()),
+    }
+    for status in STATUS_CODES:
+        summary[f'total_{status}'] = matrix.count(status)
+
+    return {
+        'year': year,
+        'month': month,
+        'summary': summary,
+        'students': columns,
+    }
+
+
+def daily_summary(students, year, month):
+    """Per-day totals and status distribution for a month as columnar arrays"""
+    first_day, last_day = month_bounds(year, month)
+    matrix = AttendanceMatrix.load(students, first_day, last_day)
+
+    totals = matrix.day_counts()
+    present = matrix.day_counts('present')
+    days = {
+        'day': [day_date.day for day_date in matrix.dates()],
+        'weekday': [day_date.weekday() for day_date in matrix.dates()],
+        'total': totals,
+        'present': present,
+        'percentage': list(map(percentage, present, totals)),
+    }
+    status_counts = {status: matrix.count(status) for status in STATUS_CODES}
+
+    return {
+        'year': year,
+        'month': month,
+        'total_students': len(matrix),
+        'total_attendances': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'days': days,
+    }
+
+
+class MonthGrid:
+    """Student x day attendance statuses for a month, queried on first use
+
+    Rows are handed to templates as callables so that calendar rows served
+    from the fragment cache never trigger the attendance query.
+    """
+
+    def __init__(self, students, year, month):
+        self.students = students
+        self.first_day, self.last_day = month_bounds(year, month)
+
+    @cached_property
+    def statuses(self):
+        by_student = {}
+        records = attendance_values_list(
+            ['student_id', 'date', 'status'], self.first_day, self.last_day, student__in=self.students
+        )
+        for student_pk, day_date, status in records:
+            by_student.setdefault(student_pk, {})[day_date.day] = status
+        return by_student
+
+    def row(self, student_pk):
+        statuses = self.statuses.get(student_pk, {})
+        total_days = len(statuses)
+        present_days = sum(1 for status in statuses.values() if status == 'present')
+        return {
+            'cells': [(day, statuses.get(day)) for day in range(1, self.last_day.day + 1)],
+            'total_days': total_days,
+            'present_days': present_days,
+            'attendance_percentage': percentage(present_days, total_days),
+        }
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Profile, Student
+from .versions import bump_students
+
+
+# Year each class moves to at the end of the academic year, oldest class first
+# so no student is promoted twice
+PROMOTIONS = [('4', Student.GRADUATED), ('3', '4'), ('2', '3'), ('1', '2')]
+
+
+def rollover_plan():
+    """[(from year, to year, students, new class teacher id)] from one grouped count"""
+    counts = dict(
+        Student.objects.filter(year__in=[old for old, new in PROMOTIONS])
+        .values_list('year').annotate(n=Count('id')).order_by()
+    )
+    teachers = Profile.teachers_by_year()
+    return [(old, new, counts.get(old, 0), teachers.get(new)) for old, new in PROMOTIONS]
+
+
+def rollover_students():
+    """Promote every class one year and graduate the final year
+
+    Runs one UPDATE per year in a single transaction; class_teacher is
+    re-derived from the teachers' assigned years (cleared for graduates).
+    Returns the plan that was applied.
+    """
+    with transaction.atomic():
+        plan = rollover_plan()
+        now = timezone.now()
+        for old, new, count, teacher_id in plan:
+            if count:
+                Student.objects.filter(year=old).update(year=new, class_teacher_id=teacher_id, updated_at=now)
+        # QuerySet.update() skips post_save; announce the change once
+        bump_students()
+    return plan
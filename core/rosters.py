@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Student
+
+
+ROSTER_GENERATION_KEY = 'roster:generation'
+ROSTER_FIELDS = ('id', 'student_id', 'first_name', 'last_name')
+
+
+def _generation():
+    generation = cache.get(ROSTER_GENERATION_KEY)
+    if generation is None:
+        # First use, or evicted: a fresh value never matches an older roster key
+        cache.add(ROSTER_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(ROSTER_GENERATION_KEY)
+    return generation
+
+
+def invalidate_rosters():
+    """Make every cached roster stale once the current transaction commits
+
+    Bumping after commit means a roster read while the change is still
+    uncommitted can't be cached under the new generation.
+    """
+    transaction.on_commit(lambda: cache.set(ROSTER_GENERATION_KEY, time.time_ns(), None))
+
+
+def teacher_roster(teacher, class_year):
+    """The teacher's students in class_year as dicts of ROSTER_FIELDS, ordered by first name
+
+    Cached per teacher and class year until any student changes.
+    """
+    key = f'roster:{teacher.pk}:{class_year}:{_generation()}'
+    roster = cache.get(key)
+    if roster is None:
+        roster = list(
+            Student.objects.filter(year=class_year, class_teacher=teacher)
+            .order_by('first_name')
+            .values(*ROSTER_FIELDS)
+        )
+        cache.set(key, roster, settings.ROSTER_CACHE_TIMEOUT)
+    return roster
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+
+
+_routing = Local()
+
+
+@contextmanager
+def use_replica():
+    """Send reads made inside the block to REPLICA_DATABASE (if configured)"""
+    previous = getattr(_routing, 'replica', False)
+    _routing.replica = True
+    try:
+        yield
+    finally:
+        _routing.replica = previous
+
+
+def replica_configured():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+class ReplicaRouter:
+    """Reads go to the replica inside use_replica() blocks, which
+    ReplicaRoutingMiddleware opens for report pages and API GETs;
+    everything else, and all writes and migrations, use default.
+
+    Models of REPLICA_PRIMARY_APPS (users, tokens, sessions) are always
+    read from default, so a login is never undone by replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            getattr(_routing, 'replica', False)
+            and model._meta.app_label not in settings.REPLICA_PRIMARY_APPS
+            and replica_configured()
+        ):
+            return settings.REPLICA_DATABASE
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
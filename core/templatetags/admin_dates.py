@@ -0,0 +1,105 @@
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.db.models import Max, Min
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def _span(queryset, field_name, **bounds):
+    """(first, last) value of field_name in the queryset within bounds"""
+    span = queryset.filter(**bounds).aggregate(first=Min(field_name), last=Max(field_name))
+    return span['first'], span['last']
+
+
+def bounded_date_hierarchy(cl):
+    """The admin date_hierarchy drill-down, for DateFields, without DISTINCT scans
+
+    Django lists the years, months or days that have rows with a DISTINCT
+    over the whole level. Here each level lists the range between the first
+    and last row in it, which an index on the field answers with two
+    lookups. A month or day in range may have no rows.
+    """
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    day_field = f'{field_name}__day'
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+    queryset = cl.queryset.order_by()
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    if not (year_lookup or month_lookup or day_lookup):
+        first, last = _span(queryset, field_name)
+        if first and last and first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year_lookup, month_field: month_lookup}),
+                'title': capfirst(formats.date_format(day, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))}],
+        }
+
+    if year_lookup and month_lookup:
+        month_start = datetime.date(int(year_lookup), int(month_lookup), 1)
+        next_month = (month_start + datetime.timedelta(days=32)).replace(day=1)
+        first, last = _span(queryset, field_name, **{f'{field_name}__gte': month_start, f'{field_name}__lt': next_month})
+        days = [first + datetime.timedelta(days=n) for n in range((last - first).days + 1)] if first else []
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year_lookup}), 'title': str(year_lookup)},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT')),
+                }
+                for day in days
+            ],
+        }
+
+    if year_lookup:
+        year = int(year_lookup)
+        first, last = _span(queryset, field_name, **{
+            f'{field_name}__gte': datetime.date(year, 1, 1), f'{field_name}__lt': datetime.date(year + 1, 1, 1),
+        })
+        months = [datetime.date(year, month, 1) for month in range(first.month, last.month + 1)] if first else []
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month.month}),
+                    'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                }
+                for month in months
+            ],
+        }
+
+    first, last = _span(queryset, field_name)
+    years = range(first.year, last.year + 1) if first else []
+    return {
+        'show': True,
+        'back': None,
+        'choices': [{'link': link({year_field: str(year)}), 'title': str(year)} for year in years],
+    }
+
+
+@register.tag(name='bounded_date_hierarchy')
+def bounded_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser, token, func=bounded_date_hierarchy, template_name='date_hierarchy.html', takes_context=False,
+    )
@@ -0,0 +1,20 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from core.assets import bundle_path
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """<script> or <link> tag for an ASSET_BUNDLES entry"""
+    if name not in settings.ASSET_BUNDLES:
+        raise template.TemplateSyntaxError(f"Unknown asset bundle '{name}'")
+    url = static(bundle_path(name))
+    if name.endswith('.css'):
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html('<script src="{}"></script>', url)
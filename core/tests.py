@@ -0,0 +1,292 @@
+import json
+import sys
+import threading
+from datetime import date
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from attendance.archive import archive_academic_year
+from attendance.models import Attendance
+from attendance.services import save_attendance_batch
+from .importers import import_student_rows, read_rows
+from .models import DataVersion, Profile, Student
+from .profiling import StackSampler
+from .rollover import rollover_students
+from .versions import STUDENTS_SCOPE
+
+
+# Pages with {% bundle %} tags, without running collectstatic for the manifest
+plain_static = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+class RolloverReportTests(TestCase):
+    def setUp(self):
+        self.hod = User.objects.create_user('hod', password='x')
+        Profile.objects.create(user=self.hod, role='hod')
+        self.teacher = User.objects.create_user('teacher', password='x')
+        Profile.objects.create(user=self.teacher, role='teacher', assigned_year='4')
+        self.student = Student.objects.create(
+            student_id='S001', first_name='Asha', last_name='Rao', year='4', class_teacher=self.teacher
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(
+                student=self.student, date=date.today(), status='present', marked_by=self.teacher
+            )
+
+    def test_promotes_every_class(self):
+        second_year_teacher = User.objects.create_user('second', password='x')
+        Profile.objects.create(user=second_year_teacher, role='teacher', assigned_year='2')
+        first = Student.objects.create(student_id='S002', first_name='Ravi', last_name='Iyer', year='1')
+        third = Student.objects.create(student_id='S003', first_name='Meera', last_name='Nair', year='3')
+
+        plan = rollover_students()
+        self.assertEqual(plan, [
+            ('4', Student.GRADUATED, 1, None),
+            ('3', '4', 1, self.teacher.pk),
+            ('2', '3', 0, None),
+            ('1', '2', 1, second_year_teacher.pk),
+        ])
+        years = dict(Student.objects.values_list('student_id', 'year'))
+        self.assertEqual(years, {'S001': Student.GRADUATED, 'S002': '2', 'S003': '4'})
+        first.refresh_from_db()
+        third.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual(first.class_teacher, second_year_teacher)
+        self.assertEqual(third.class_teacher, self.teacher)
+        self.assertIsNone(self.student.class_teacher)
+
+    def test_graduates_in_hod_calendar(self):
+        rollover_students()
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.year, Student.GRADUATED)
+
+        self.client.force_login(self.hod)
+        response = self.client.get(reverse('attendance_reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Asha')
+
+        # The graduate's own attendance scope still moves the report's ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(student=self.student).get().delete()
+        again = self.client.get(reverse('attendance_reports'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+
+class CalendarVersionTests(TestCase):
+    """Calendar rows are cached per data version; writes must move the version"""
+
+    def setUp(self):
+        cache.clear()
+        self.hod = User.objects.create_user('hod', password='x')
+        Profile.objects.create(user=self.hod, role='hod')
+        self.teacher = User.objects.create_user('teacher', password='x')
+        Profile.objects.create(user=self.teacher, role='teacher', assigned_year='1')
+        self.student = Student.objects.create(
+            student_id='S001', first_name='Asha', last_name='Rao', year='1', class_teacher=self.teacher
+        )
+        self.client.force_login(self.hod)
+
+    def calendar(self, **headers):
+        return self.client.get(reverse('attendance_reports'), **headers)
+
+    def mark(self, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_attendance_batch(
+                [{'student': self.student.pk, 'date': date.today().isoformat(), 'status': status}],
+                Student.objects.all(), self.teacher,
+            )
+
+    def test_marking_refreshes_cached_rows(self):
+        self.mark('present')
+        first = self.calendar()
+        self.assertContains(first, 'day-cell attendance-present')
+        self.assertEqual(self.calendar(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.mark('absent')
+        second = self.calendar(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, 'day-cell attendance-absent')
+        self.assertNotContains(second, 'day-cell attendance-present')
+
+    def test_student_edit_refreshes_cached_rows(self):
+        first = self.calendar()
+        self.student.first_name = 'Asha Devi'
+        self.student.save()
+        second = self.calendar(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, 'Asha Devi')
+
+    def test_archived_month_stays_in_reports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(
+                student=self.student, date=date(2023, 10, 2), status='present', marked_by=self.teacher
+            )
+        month = {'year': 2023, 'month': 10}
+        first = self.client.get(reverse('attendance_reports'), month)
+        self.assertContains(first, 'day-cell attendance-present')
+
+        archive_academic_year(2023)
+        self.assertFalse(Attendance.objects.exists())
+        second = self.client.get(reverse('attendance_reports'), month, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertContains(second, 'day-cell attendance-present')
+
+        summary = self.client.get(reverse('monthly_reports_data'), month).json()
+        self.assertEqual(summary['summary']['total_present'], 1)
+
+
+class MarkAttendanceBatchTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x')
+        Profile.objects.create(user=self.teacher, role='teacher', assigned_year='1')
+        self.student = Student.objects.create(
+            student_id='S001', first_name='Asha', last_name='Rao', year='1', class_teacher=self.teacher
+        )
+        self.other_class = Student.objects.create(student_id='S002', first_name='Ravi', last_name='Iyer', year='2')
+        self.client.force_login(self.teacher)
+
+    def post(self, payload):
+        return self.client.post(reverse('mark_attendance_batch'), json.dumps(payload), content_type='application/json')
+
+    def test_saves_and_reports_by_index(self):
+        today = date.today().isoformat()
+        response = self.post({'batch_id': 'b1', 'changes': [
+            {'student': self.student.pk, 'date': today, 'status': 'late', 'remarks': 'Bus', 'version': 0},
+            {'student': self.other_class.pk, 'date': today, 'status': 'present'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['batch_id'], data['saved']), ('b1', 1))
+        self.assertEqual(data['versions'], [{'index': 0, 'version': 1}])
+        self.assertEqual([error['index'] for error in data['errors']], [1])
+        record = Attendance.objects.get(student=self.student)
+        self.assertEqual((record.status, record.remarks, record.marked_by), ('late', 'Bus', self.teacher))
+
+        # Resending the batch (a retry after a dropped response) changes nothing
+        again = self.post({'batch_id': 'b1', 'changes': [
+            {'student': self.student.pk, 'date': today, 'status': 'late', 'remarks': 'Bus', 'version': 0},
+        ]}).json()
+        self.assertEqual((again['saved'], again['unchanged'], again['conflicts']), (0, 1, []))
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.post({'changes': {}}).status_code, 400)
+        response = self.client.post(reverse('mark_attendance_batch'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @plain_static
+    def test_basic_form_without_javascript(self):
+        url = f"{reverse('mark_attendance')}?date={date.today().isoformat()}&form=basic"
+        page = self.client.get(url)
+        self.assertContains(page, f'name="status_{self.student.pk}"')
+        self.assertNotContains(page, 'attendance-roster')
+        self.assertContains(self.client.get(reverse('mark_attendance')), 'form=basic')
+
+        response = self.client.post(url, {f'status_{self.student.pk}': 'absent', f'version_{self.student.pk}': '0'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(Attendance.objects.get(student=self.student).status, 'absent')
+
+        # Rendered before someone else's mark: that mark is kept
+        self.client.post(url, {f'status_{self.student.pk}': 'present', f'version_{self.student.pk}': '0'})
+        self.assertEqual(Attendance.objects.get(student=self.student).status, 'absent')
+
+    def test_teachers_only(self):
+        hod = User.objects.create_user('hod', password='x')
+        Profile.objects.create(user=hod, role='hod')
+        self.client.force_login(hod)
+        self.assertEqual(self.post({'changes': []}).status_code, 403)
+
+
+class ImportStudentsTests(TestCase):
+    def setUp(self):
+        self.hod = User.objects.create_user('hod', password='x')
+        self.hod_profile = Profile.objects.create(user=self.hod, role='hod')
+        self.teacher = User.objects.create_user('teacher', password='x')
+        Profile.objects.create(user=self.teacher, role='teacher', assigned_year='2')
+        Student.objects.create(student_id='S000', first_name='Old', last_name='Entry', year='1')
+
+    def upload(self, content):
+        return read_rows(SimpleUploadedFile('students.csv', content.encode() if isinstance(content, str) else content))
+
+    def students_version(self):
+        return DataVersion.objects.filter(scope=STUDENTS_SCOPE).values_list('version', flat=True).first() or 0
+
+    def test_import(self):
+        before = self.students_version()
+        result = import_student_rows(self.upload(
+            'Student ID,First Name,Last Name,Year,Email\n'
+            'S001,Asha,Rao,Second Year,asha@example.com\n'
+            'S002,Ravi,Iyer,5,\n'
+            'S001,Asha,Again,2,\n'
+            'S000,Old,Entry,1,\n'
+            'S003,Meera,Nair,1,not-an-email\n'
+        ), self.hod, self.hod_profile, chunk_size=2)
+
+        self.assertEqual((result.total_rows, result.created), (5, 1))
+        self.assertEqual([row_number for row_number, message in result.errors], [3, 4, 5, 6])
+        student = Student.objects.get(student_id='S001')
+        self.assertEqual((student.year, student.class_teacher), ('2', self.teacher))
+        self.assertEqual(self.students_version(), before + 1)
+
+    def test_failure_keeps_earlier_chunks_announced(self):
+        before = self.students_version()
+        good = ''.join(f'S{n:04d},First{n},Last{n},1\n' for n in range(1, 400))
+        rows = self.upload(b'student_id,first_name,last_name,year\n' + good.encode() + b'S9999,\xff\xfe,Bad,1\n')
+        with self.assertRaises(UnicodeDecodeError):
+            import_student_rows(rows, self.hod, self.hod_profile, chunk_size=50)
+        self.assertTrue(Student.objects.filter(student_id='S0001').exists())
+        self.assertEqual(self.students_version(), before + 1)
+
+
+class StackSamplerTests(TestCase):
+    def test_overlapping_samplers_restore_the_switch_interval(self):
+        original = sys.getswitchinterval()
+        first = StackSampler(threading.get_ident(), 0.001)
+        second = StackSampler(threading.get_ident(), 0.001)
+        first.__enter__()
+        second.__enter__()
+        # Exits out of order: the interval stays low until the last one ends
+        first.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), 0.001)
+        second.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), original)
+
+
+class ExportTests(TestCase):
+    def test_ndjson_header_then_arrays(self):
+        hod = User.objects.create_user('hod', password='x')
+        Profile.objects.create(user=hod, role='hod')
+        student = Student.objects.create(student_id='S001', first_name='Asha', last_name='Rao', year='1')
+        Attendance.objects.create(student=student, date=date(2026, 1, 5), status='late', marked_by=hod)
+        self.client.force_login(hod)
+
+        response = self.client.get(reverse('export_report_csv'), {'report_type': 'detailed', 'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])[:3], ['student_id', 'first_name', 'last_name'])
+        self.assertEqual(dict(zip(json.loads(lines[0]), json.loads(lines[1])))['status'], 'late')
+        self.assertEqual(len(lines), 2)
+
+
+@plain_static
+class BenchmarkConnectionsTests(TransactionTestCase):
+    # The command closes the connection, which a TestCase transaction forbids
+    def test_restores_conn_max_age(self):
+        admin = User.objects.create_user('admin', password='x')
+        Profile.objects.create(user=admin, role='admin')
+        original = connection.settings_dict['CONN_MAX_AGE']
+        out = StringIO()
+
+        call_command('benchmark_connections', requests=2, max_age='0,600', stdout=out)
+        self.assertIn('CONN_MAX_AGE=600', out.getvalue())
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], original)
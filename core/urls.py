@@ -9,6 +9,7 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/progress/stream/', views.marking_progress_stream, name='marking_progress_stream'),
 
     # Teacher Management
     path('teachers/', views.teacher_list, name='teacher_list'),
@@ -20,6 +21,7 @@ urlpatterns = [
     # Student Management
     path('students/', views.student_list, name='student_list'),
     path('students/add/', views.add_student, name='add_student'),
+    path('students/import/', views.import_students, name='import_students'),
     path('students/edit/<int:student_id>/', views.edit_student, name='edit_student'),
     path('students/delete/<int:student_id>/', views.delete_student, name='delete_student'),
 
@@ -29,6 +31,7 @@ urlpatterns = [
 
     # Attendance (Core app versions - TEACHERS ONLY)
     path('mark-attendance/', views.mark_attendance, name='mark_attendance'),
+    path('mark-attendance/batch/', views.mark_attendance_batch, name='mark_attendance_batch'),
     path('attendance-reports/', views.attendance_reports, name='attendance_reports'),
 
     # Other
@@ -41,7 +44,9 @@ urlpatterns = [
     path('attendance-reports/', views.attendance_reports, name='attendance_reports'),
     path('reports/detailed/', views.detailed_reports, name='detailed_reports'),
     path('reports/monthly/', views.monthly_reports, name='monthly_reports'),
+    path('reports/monthly/data/', views.monthly_reports_data, name='monthly_reports_data'),
     path('reports/student-wise/', views.student_wise_reports, name='student_wise_reports'),
     path('reports/export-csv/', views.export_report_csv, name='export_report_csv'),
     path('reports/analytics/', views.attendance_analytics, name='attendance_analytics'),
+    path('reports/analytics/data/', views.attendance_analytics_data, name='attendance_analytics_data'),
 ]
\ No newline at end of file
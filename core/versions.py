@@ -0,0 +1,145 @@
+import hashlib
+from datetime import date, datetime, time
+from functools import wraps
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from attendance.signals import attendance_changed
+from .models import DataVersion, Profile, Student
+from .rosters import invalidate_rosters
+
+
+STUDENTS_SCOPE = 'students'
+
+# Graduates keep their attendance history, so they have scopes too
+CLASS_YEARS = [code for code, name in Student.ALL_YEAR_CHOICES]
+
+
+def attendance_scope(class_year, year=None, month=None):
+    """Scope for one class year's attendance, all-time or for a single month"""
+    if year is None:
+        return f'attendance:{class_year}'
+    return f'attendance:{class_year}:{year:04d}-{month:02d}'
+
+
+def class_years_for(user):
+    """Class years whose data the user's reports are built from"""
+    try:
+        profile = user.profile
+    except Profile.DoesNotExist:
+        profile = None
+
+    if user.is_superuser or (profile and profile.role == 'hod'):
+        return list(CLASS_YEARS)
+    if profile and profile.assigned_year:
+        return [profile.assigned_year]
+    return []
+
+
+def bump_versions(scopes):
+    """Increment the version of every scope, creating missing rows"""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+
+    now = timezone.now()
+    updated = DataVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1, updated_at=now)
+    if updated < len(scopes):
+        existing = set(DataVersion.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+        missing = [scope for scope in scopes if scope not in existing]
+        DataVersion.objects.bulk_create(
+            [DataVersion(scope=scope, version=0, updated_at=now) for scope in missing],
+            ignore_conflicts=True
+        )
+        DataVersion.objects.filter(scope__in=missing).update(version=F('version') + 1, updated_at=now)
+
+
+def bump_students():
+    """Record a change to student rows (names, years, teacher assignment)"""
+    bump_versions([STUDENTS_SCOPE])
+    invalidate_rosters()
+
+
+def get_versions(scopes):
+    """Current version and last change time for each scope (0/None if never written)"""
+    rows = DataVersion.objects.filter(scope__in=scopes).values_list('scope', 'version', 'updated_at')
+    found = {scope: (version, updated_at) for scope, version, updated_at in rows}
+    return {scope: found.get(scope, (0, None)) for scope in scopes}
+
+
+def _report_version(request, scopes_func, per_day, args, kwargs):
+    # condition() asks for the ETag and Last-Modified separately; look up once
+    if not hasattr(request, '_report_version'):
+        scopes = scopes_func(request, *args, **kwargs)
+        if scopes is None:
+            request._report_version = (None, None)
+        else:
+            scopes = sorted(set(scopes) | {STUDENTS_SCOPE})
+            versions = get_versions(scopes)
+            key = [
+                str(request.user.pk),
+                request.get_full_path(),
+                *(f'{scope}={versions[scope][0]}' for scope in scopes),
+            ]
+            timestamps = [updated_at for version, updated_at in versions.values() if updated_at]
+            if per_day:
+                # A new day changes the report before any write bumps a scope
+                today = date.today()
+                key.append(today.isoformat())
+                timestamps.append(timezone.make_aware(datetime.combine(today, time.min)))
+            key = '|'.join(key)
+            request._report_version = (
+                hashlib.sha1(key.encode()).hexdigest(),
+                max(timestamps) if timestamps else None,
+            )
+    return request._report_version
+
+
+def conditional_report(scopes_func, per_day=False):
+    """ETag/Last-Modified for a report view from the data versions of its scopes
+
+    scopes_func(request, *args, **kwargs) returns the scopes the response is
+    built from, or None to skip conditional handling. Unchanged reports are
+    answered with 304 Not Modified before the view runs. per_day is for
+    reports of the current date, which change at midnight.
+    """
+    def etag_func(request, *args, **kwargs):
+        return _report_version(request, scopes_func, per_day, args, kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return _report_version(request, scopes_func, per_day, args, kwargs)[1]
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Per-user content that browsers must revalidate instead of guessing freshness
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+
+    return decorator
+
+
+@receiver(attendance_changed)
+def attendance_versions_changed(sender, changes, **kwargs):
+    scopes = set()
+    for change in changes:
+        class_years = [change.class_year] if change.class_year else CLASS_YEARS
+        for class_year in class_years:
+            scopes.add(attendance_scope(class_year))
+            scopes.add(attendance_scope(class_year, change.date.year, change.date.month))
+    bump_versions(scopes)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_versions_changed(sender, **kwargs):
+    bump_students()
@@ -1,12 +1,70 @@
 ﻿from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import admin
 from .models import Profile, Student
 from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+import json
+import os
 from datetime import date
+from functools import partial
+from attendance.archive import attendance_values
+from attendance.bitmaps import AttendanceHistory
+from attendance.cumulative import range_counts
 from attendance.models import Attendance
+from attendance.services import save_attendance_batch
+from .exports import (
+    DETAILED_COLUMNS, EXPORT_FORMATS, SUMMARY_COLUMNS, available_formats, detailed_rows, stream_export, summary_rows
+)
+from .profiling import list_profiles, profile_file_path
+from .importers import IMPORT_COLUMNS, import_student_rows, read_rows
+from .live import marking_progress, progress_events
+from .rosters import teacher_roster
+from .reports import MonthGrid, scope_students, month_bounds, monthly_summary, daily_summary
+from .versions import CLASS_YEARS, attendance_scope, bump_students, class_years_for, conditional_report, get_versions
+
+
+# Rows listed on the import results page; the rest are only counted
+MAX_IMPORT_ERRORS_SHOWN = 500
+
+
+def _month_report_scopes(request):
+    """Data-version scopes for reports of one month (?year=&month=)"""
+    try:
+        report_year = int(request.GET.get('year', date.today().year))
+        report_month = int(request.GET.get('month', date.today().month))
+    except ValueError:
+        return None
+    if not 1 <= report_month <= 12:
+        return None
+    return [attendance_scope(class_year, report_year, report_month)
+            for class_year in class_years_for(request.user)]
+
+
+def _student_report_scopes(request):
+    """Data-version scopes for the selected student's full history"""
+    student_id = request.GET.get('student_id', '')
+    if not student_id:
+        return []
+    if not student_id.isdigit():
+        return None
+    class_year = Student.objects.filter(id=student_id).values_list('year', flat=True).first()
+    if class_year is None:
+        return None
+    return [attendance_scope(class_year)]
+
+
+def _export_report_scopes(request):
+    """Data-version scopes for exports over any date range"""
+    return [attendance_scope(class_year) for class_year in class_years_for(request.user)]
 
 
 def home(request):
@@ -61,10 +119,16 @@ def dashboard(request):
             count = Student.objects.filter(year=year_code).count()
             year_stats[year_name] = count
 
+        # Today's marking per year and class; kept live by marking_progress_stream
+        progress = marking_progress(today)
+
         context.update({
             'total_students': total_students,
             'total_teachers': total_teachers,
             'year_stats': year_stats,
+            'progress': progress,
+            'present_today': sum(row['present'] for row in progress['years']),
+            'absent_today': sum(row['absent'] for row in progress['years']),
             'dashboard_type': 'admin'
         })
 
@@ -79,10 +143,16 @@ def dashboard(request):
             count = Student.objects.filter(year=year_code).count()
             year_stats[year_name] = count
 
+        # Today's marking per year and class; kept live by marking_progress_stream
+        progress = marking_progress(today)
+
         context.update({
             'total_students': total_students,
             'total_teachers': total_teachers,
             'year_stats': year_stats,
+            'progress': progress,
+            'present_today': sum(row['present'] for row in progress['years']),
+            'absent_today': sum(row['absent'] for row in progress['years']),
             'dashboard_type': 'hod'
         })
 
@@ -122,6 +192,25 @@ def dashboard(request):
     return render(request, 'core/dashboard.html', context)
 
 
+@login_required
+async def marking_progress_stream(request):
+    """Server-sent events with today's marking progress for the Admin/HOD dashboard"""
+    user = await request.auser()
+    role = await Profile.objects.filter(user=user).values_list('role', flat=True).afirst()
+    if not (user.is_superuser or role == 'hod'):
+        return JsonResponse({'error': 'Only Admin and HOD can follow marking progress.'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held by the stream for good; 204 tells
+        # EventSource to stop, leaving the dashboard as rendered
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(progress_events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def logout_view(request):
     logout(request)
     messages.success(request, 'You have been successfully logged out.')
@@ -226,6 +315,7 @@ def add_teacher(request):
 
             if assigned_year:
                 Student.objects.filter(year=assigned_year).update(class_teacher=teacher)
+                bump_students()
 
             messages.success(request, f'Teacher {username} added successfully!')
             return redirect('teacher_list')
@@ -270,6 +360,7 @@ def assign_year(request, teacher_id):
             if assigned_year:
 
                 Student.objects.filter(year=assigned_year).update(class_teacher=teacher)
+            bump_students()
 
         messages.success(request, f'Year {assigned_year} assigned to teacher {teacher.username}!')
         return redirect('teacher_list')
@@ -324,6 +415,7 @@ def edit_teacher(request, teacher_id):
             if assigned_year:
 
                 Student.objects.filter(year=assigned_year).update(class_teacher=teacher)
+            bump_students()
 
         messages.success(request, f'Teacher {teacher.username} updated successfully!')
         return redirect('teacher_list')
@@ -501,6 +593,42 @@ def add_student(request):
     })
 
 
+@login_required
+def import_students(request):
+    """Bulk add students from an uploaded CSV/XLSX file"""
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        role = 'admin' if request.user.is_superuser else 'teacher'
+        profile = Profile.objects.create(user=request.user, role=role)
+
+    result = None
+    if request.method == 'POST':
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            messages.error(request, 'Please choose a file to import.')
+        else:
+            try:
+                result = import_student_rows(read_rows(uploaded_file), request.user, profile)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                if result.created:
+                    messages.success(request, f'{result.created} students imported successfully!')
+                if result.errors:
+                    messages.warning(request, f'{len(result.errors)} rows were skipped. See the errors below.')
+
+    return render(request, 'core/import_students.html', {
+        'title': 'Import Students',
+        'result': result,
+        'errors': result.errors[:MAX_IMPORT_ERRORS_SHOWN] if result else [],
+        'max_errors_shown': MAX_IMPORT_ERRORS_SHOWN,
+        'columns': IMPORT_COLUMNS,
+        'show_year_field': request.user.is_superuser or profile.role == 'hod',
+        'profile': profile
+    })
+
+
 @login_required
 def edit_student(request, student_id):
     """Edit student details"""
@@ -750,53 +878,79 @@ def mark_attendance(request):
     year_name = dict(Student.YEAR_CHOICES).get(profile.assigned_year, 'Unknown')
 
 
-    students = Student.objects.filter(
-        year=profile.assigned_year,
-        class_teacher=request.user
-    ).order_by('first_name')
-
-    if not students.exists():
+    roster = teacher_roster(request.user, profile.assigned_year)
+    if not roster:
         messages.warning(request, f'No students assigned to you in {year_name}. Contact HOD.')
         return redirect('teacher_panel')
 
+    if request.method == 'POST':
+        # The basic form (no JavaScript); only students with a submitted
+        # status. With JavaScript the page sends its changes to
+        # mark_attendance_batch instead.
+        changes = []
+        for student in roster:
+            status_key = f"status_{student['id']}"
+            remarks_key = f"remarks_{student['id']}"
+            version_key = f"version_{student['id']}"
+            if status_key not in request.POST:
+                continue
+
+            change = {
+                'student': student['id'],
+                'date': attendance_date.isoformat(),
+                'status': request.POST.get(status_key, 'present'),
+            }
+            if remarks_key in request.POST:
+                change['remarks'] = request.POST[remarks_key]
+            # The version the form was rendered with: marks saved by someone
+            # else since then are kept rather than overwritten
+            if request.POST.get(version_key, '').isdigit():
+                change['version'] = int(request.POST[version_key])
+            changes.append(change)
+
+        # Students whose attendance already matches aren't written again
+        students = Student.objects.filter(year=profile.assigned_year, class_teacher=request.user)
+        result = save_attendance_batch(changes, students, request.user)
+        success_count = result.saved + result.unchanged
+
+        if success_count > 0:
+            messages.success(request, f'Attendance marked for {success_count} student(s) in {year_name}!')
+        for index, error in result.errors:
+            messages.error(request, error)
+        if result.conflicts:
+            messages.warning(
+                request,
+                f'{len(result.conflicts)} student(s) were marked by someone else meanwhile; '
+                'their marks were kept. Review them below.'
+            )
+        # Back to the same date and form
+        return redirect(f"{reverse('mark_attendance')}?{request.GET.urlencode()}")
 
     existing_attendance = {}
     attendance_records = Attendance.objects.filter(
-        student__in=students,
+        student_id__in=[student['id'] for student in roster],
         date=attendance_date
-    )
+    ).values('student_id', 'status', 'remarks', 'version')
     for record in attendance_records:
-        existing_attendance[record.student.id] = {
-            'status': record.status,
-            'remarks': record.remarks
+        existing_attendance[record['student_id']] = {
+            'status': record['status'],
+            'remarks': record['remarks'],
+            'version': record['version'],
         }
 
-    if request.method == 'POST':
-        success_count = 0
-
-        for student in students:
-            status_key = f"status_{student.id}"
-            remarks_key = f"remarks_{student.id}"
-
-            status = request.POST.get(status_key, 'present')
-            remarks = request.POST.get(remarks_key, '')
-
-
-            attendance, created = Attendance.objects.update_or_create(
-                student=student,
-                date=attendance_date,
-                defaults={
-                    'status': status,
-                    'marked_by': request.user,
-                    'remarks': remarks
-                }
-            )
-
-            success_count += 1
-
-        if success_count > 0:
-            messages.success(request, f'Attendance marked for {success_count} student(s) in {year_name}!')
-        return redirect('mark_attendance')
+    # Compact rows for the virtualized list in attendance.js: [pk, student ID,
+    # name, saved status, record version]; the saved status is empty and the
+    # version 0 until the student is marked for this date
+    students = []
+    for student in roster:
+        record = existing_attendance.get(student['id'], {})
+        students.append([
+            student['id'],
+            student['student_id'],
+            f"{student['first_name']} {student['last_name']}",
+            record.get('status', ''),
+            record.get('version', 0),
+        ])
 
     context = {
         'title': f'Mark Attendance - {year_name}',
@@ -805,12 +959,43 @@ def mark_attendance(request):
         'attendance_date': attendance_date,
         'today': date.today(),
         'existing_attendance': existing_attendance,
+        # Server-rendered selects posted as a plain form, for browsers without JavaScript
+        'basic_form': request.GET.get('form') == 'basic',
     }
 
     return render(request, 'core/mark_attendance.html', context)
 
 
 @login_required
+@require_POST
+def mark_attendance_batch(request):
+    """Save a JSON batch of attendance changes (only the edited rows) for the teacher's class"""
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        profile = Profile.objects.create(user=request.user, role='teacher')
+
+    if profile.role != 'teacher' or not profile.assigned_year:
+        return JsonResponse({'error': 'Only teachers with an assigned year can mark attendance.'}, status=403)
+
+    try:
+        payload = json.loads(request.body)
+        changes = payload['changes']
+        if not isinstance(changes, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"changes": [...]}.'}, status=400)
+
+    students = Student.objects.filter(year=profile.assigned_year, class_teacher=request.user)
+    result = save_attendance_batch(changes, students, request.user)
+
+    response = result.as_dict()
+    response['batch_id'] = payload.get('batch_id')
+    return JsonResponse(response)
+
+
+@login_required
+@conditional_report(_month_report_scopes)
 def attendance_reports(request):
 
     try:
@@ -847,40 +1032,17 @@ def attendance_reports(request):
     month_name = calendar.month_name[report_month]
 
 
-    student_calendar_data = []
-    for student in students:
-
-        monthly_attendance = Attendance.objects.filter(
-            student=student,
-            date__year=report_year,
-            date__month=report_month
-        )
-
-
-        attendance_by_day = {}
-        for attendance in monthly_attendance:
-            day = attendance.date.day
-            attendance_by_day[day] = {
-                'status': attendance.status,
-                'remarks': attendance.remarks,
-                'date': attendance.date
-            }
-
-
-        total_days = monthly_attendance.count()
-        present_days = monthly_attendance.filter(status='present').count()
-
-        if total_days > 0:
-            attendance_percentage = (present_days / total_days) * 100
-        else:
-            attendance_percentage = 0
+    # Rows are cached per (student, month, data version); only rows missing
+    # from the cache make the grid query the month's attendance.
+    grid = MonthGrid(students, report_year, report_month)
+    versions = get_versions([attendance_scope(code, report_year, report_month) for code in CLASS_YEARS])
 
+    student_calendar_data = []
+    for student in students.only('id', 'student_id', 'first_name', 'last_name', 'year', 'updated_at'):
         student_calendar_data.append({
             'student': student,
-            'attendance_by_day': attendance_by_day,
-            'total_days': total_days,
-            'present_days': present_days,
-            'attendance_percentage': round(attendance_percentage, 2),
+            'version': versions[attendance_scope(student.year, report_year, report_month)][0],
+            'row': partial(grid.row, student.id),
         })
 
 
@@ -915,6 +1077,7 @@ def attendance_reports(request):
         'month_names': month_names,
         'year_range': year_range,
         'is_admin': request.user.is_superuser or profile.role == 'hod',
+        'row_cache_timeout': settings.CALENDAR_ROW_CACHE_TIMEOUT,
     }
 
     return render(request, 'core/attendance_calendar.html', context)
@@ -1117,30 +1280,43 @@ def detailed_reports(request):
             teachers = User.objects.none()
             messages.warning(request, 'No year assigned to you.')
 
-    # Apply filters
-    if start_date:
-        start_date_obj = date.fromisoformat(start_date)
+    # Apply filters; the statistics cover the same students, from their running totals
+    start_date_obj = date.fromisoformat(start_date) if start_date else None
+    end_date_obj = date.fromisoformat(end_date) if end_date else None
+    counted_students = students
+    if start_date_obj:
         attendances = attendances.filter(date__gte=start_date_obj)
-    if end_date:
-        end_date_obj = date.fromisoformat(end_date)
+    if end_date_obj:
         attendances = attendances.filter(date__lte=end_date_obj)
     if year_filter:
         students_in_year = Student.objects.filter(year=year_filter)
         attendances = attendances.filter(student__in=students_in_year)
+        counted_students = counted_students.filter(year=year_filter)
     if teacher_filter:
         teacher = User.objects.filter(id=teacher_filter, profile__role='teacher').first()
         if teacher:
             students_of_teacher = Student.objects.filter(class_teacher=teacher)
             attendances = attendances.filter(student__in=students_of_teacher)
+            counted_students = counted_students.filter(class_teacher=teacher)
     if status_filter:
         attendances = attendances.filter(status=status_filter)
 
-    # Calculate statistics
-    total_records = attendances.count()
-    present_count = attendances.filter(status='present').count()
-    absent_count = attendances.filter(status='absent').count()
-    late_count = attendances.filter(status='late').count()
-    excused_count = attendances.filter(status='excused').count()
+    # Calculate statistics: two lookups per student, whatever the date range
+    student_counts = range_counts(counted_students, start_date_obj, end_date_obj)
+    if status_filter:
+        student_counts = {
+            student_pk: {status: n if status == status_filter else 0 for status, n in counts.items()}
+            for student_pk, counts in student_counts.items()
+        }
+    status_totals = {
+        status: sum(counts[status] for counts in student_counts.values())
+        for status in ('present', 'absent', 'late', 'excused')
+    }
+    present_count = status_totals['present']
+    absent_count = status_totals['absent']
+    late_count = status_totals['late']
+    excused_count = status_totals['excused']
+    total_records = sum(status_totals.values())
 
     if total_records > 0:
         present_percentage = (present_count / total_records) * 100
@@ -1154,10 +1330,10 @@ def detailed_reports(request):
     student_stats = []
     student_queryset = students if students.exists() else Student.objects.all()
 
-    for student in student_queryset[:20]:  # Limit to 20 for performance
-        student_attendance = attendances.filter(student=student)
-        student_total = student_attendance.count()
-        student_present = student_attendance.filter(status='present').count()
+    for student in student_queryset.select_related('class_teacher')[:20]:  # Limit to 20 for performance
+        counts = student_counts.get(student.pk, {})
+        student_total = sum(counts.values())
+        student_present = counts.get('present', 0)
 
         if student_total > 0:
             student_percentage = (student_present / student_total) * 100
@@ -1206,7 +1382,7 @@ def detailed_reports(request):
 
 @login_required
 def monthly_reports(request):
-    """Monthly attendance summary reports"""
+    """Monthly attendance summary reports (table and totals load from monthly_reports_data)"""
     try:
         profile = request.user.profile
     except Profile.DoesNotExist:
@@ -1224,64 +1400,8 @@ def monthly_reports(request):
         report_year = date.today().year
         report_month = date.today().month
 
-    # Base queryset based on role
-    if request.user.is_superuser or profile.role == 'hod':
-        students = Student.objects.all()
-    else:
-        assigned_year = profile.assigned_year
-        if assigned_year:
-            students = Student.objects.filter(year=assigned_year, class_teacher=request.user)
-        else:
-            students = Student.objects.none()
-            messages.warning(request, 'No year assigned to you.')
-
-    # Calculate monthly statistics for each student
-    monthly_data = []
-    for student in students:
-        # Get attendance for the month
-        monthly_attendance = Attendance.objects.filter(
-            student=student,
-            date__year=report_year,
-            date__month=report_month
-        )
-
-        total_days = monthly_attendance.count()
-        present_days = monthly_attendance.filter(status='present').count()
-        absent_days = monthly_attendance.filter(status='absent').count()
-        late_days = monthly_attendance.filter(status='late').count()
-        excused_days = monthly_attendance.filter(status='excused').count()
-
-        if total_days > 0:
-            attendance_percentage = (present_days / total_days) * 100
-        else:
-            attendance_percentage = 0
-
-        monthly_data.append({
-            'student': student,
-            'total_days': total_days,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'late_days': late_days,
-            'excused_days': excused_days,
-            'attendance_percentage': round(attendance_percentage, 2),
-        })
-
-    # Calculate overall statistics
-    total_students = len(monthly_data)
-    if total_students > 0:
-        avg_attendance = sum(item['attendance_percentage'] for item in monthly_data) / total_students
-        total_present = sum(item['present_days'] for item in monthly_data)
-        total_absent = sum(item['absent_days'] for item in monthly_data)
-        total_late = sum(item['late_days'] for item in monthly_data)
-        total_excused = sum(item['excused_days'] for item in monthly_data)
-        total_days_all = sum(item['total_days'] for item in monthly_data)
-
-        if total_days_all > 0:
-            overall_percentage = (total_present / total_days_all) * 100
-        else:
-            overall_percentage = 0
-    else:
-        avg_attendance = overall_percentage = total_present = total_absent = total_late = total_excused = 0
+    if not (request.user.is_superuser or profile.role == 'hod') and not profile.assigned_year:
+        messages.warning(request, 'No year assigned to you.')
 
     # Year and month choices for dropdown
     current_year = date.today().year
@@ -1295,18 +1415,10 @@ def monthly_reports(request):
     context = {
         'title': f'Monthly Report - {month_choices[report_month - 1][1]} {report_year}',
         'profile': profile,
-        'monthly_data': monthly_data,
         'report_year': report_year,
         'report_month': report_month,
         'year_choices': year_choices,
         'month_choices': month_choices,
-        'total_students': total_students,
-        'avg_attendance': round(avg_attendance, 2),
-        'overall_percentage': round(overall_percentage, 2),
-        'total_present': total_present,
-        'total_absent': total_absent,
-        'total_late': total_late,
-        'total_excused': total_excused,
         'is_admin': request.user.is_superuser or profile.role == 'hod',
     }
 
@@ -1314,6 +1426,29 @@ def monthly_reports(request):
 
 
 @login_required
+@conditional_report(_month_report_scopes)
+def monthly_reports_data(request):
+    """Monthly per-student summary as compact columnar JSON"""
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        role = 'admin' if request.user.is_superuser else 'teacher'
+        profile = Profile.objects.create(user=request.user, role=role)
+
+    try:
+        report_year = int(request.GET.get('year', date.today().year))
+        report_month = int(request.GET.get('month', date.today().month))
+        month_bounds(report_year, report_month)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid year or month.'}, status=400)
+
+    students = scope_students(request.user, profile)
+    data = monthly_summary(students, report_year, report_month)
+    return JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+
+
+@login_required
+@conditional_report(_student_report_scopes)
 def student_wise_reports(request):
     """Student-wise detailed attendance reports"""
     try:
@@ -1350,24 +1485,24 @@ def student_wise_reports(request):
             messages.error(request, 'Access denied.')
             return redirect('student_wise_reports')
 
-        # Get attendance with date filter
-        attendance_qs = Attendance.objects.filter(student=student)
-
-        if start_date:
-            start_date_obj = date.fromisoformat(start_date)
-            attendance_qs = attendance_qs.filter(date__gte=start_date_obj)
-        if end_date:
-            end_date_obj = date.fromisoformat(end_date)
-            attendance_qs = attendance_qs.filter(date__lte=end_date_obj)
-
-        attendance_records = attendance_qs.order_by('-date')
-
-        # Calculate summary
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(status='present').count()
-        absent_days = attendance_records.filter(status='absent').count()
-        late_days = attendance_records.filter(status='late').count()
-        excused_days = attendance_records.filter(status='excused').count()
+        # Get attendance with date filter (archived years are included when the range reaches them)
+        start_date_obj = date.fromisoformat(start_date) if start_date else None
+        end_date_obj = date.fromisoformat(end_date) if end_date else None
+
+        attendance_records = attendance_values(
+            ['date', 'status', 'remarks', 'created_at', 'marked_by__username'],
+            start_date_obj, end_date_obj, student=student
+        ).order_by('-date')
+
+        # Calculate summary from the per-year bitmaps (live and archived days alike)
+        history = AttendanceHistory.load(student)
+        counts = history.counts(start_date_obj, end_date_obj)
+        current_streak, longest_streak = history.streaks('present', start_date_obj, end_date_obj)
+        total_days = sum(counts.values())
+        present_days = counts.get('present', 0)
+        absent_days = counts.get('absent', 0)
+        late_days = counts.get('late', 0)
+        excused_days = counts.get('excused', 0)
 
         if total_days > 0:
             attendance_percentage = (present_days / total_days) * 100
@@ -1381,6 +1516,8 @@ def student_wise_reports(request):
             'late_days': late_days,
             'excused_days': excused_days,
             'attendance_percentage': round(attendance_percentage, 2),
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
             'start_date': start_date,
             'end_date': end_date,
         }
@@ -1402,8 +1539,9 @@ def student_wise_reports(request):
 
 
 @login_required
+@conditional_report(_export_report_scopes)
 def export_report_csv(request):
-    """Export attendance report as CSV"""
+    """Export attendance report as CSV, or with ?format= as Parquet, Arrow or NDJSON"""
     try:
         profile = request.user.profile
     except Profile.DoesNotExist:
@@ -1415,10 +1553,45 @@ def export_report_csv(request):
     start_date = request.GET.get('start_date', '')
     end_date = request.GET.get('end_date', '')
     year_filter = request.GET.get('year', '')
+    export_format = request.GET.get('format', 'csv')
 
     import csv
-    from django.http import HttpResponse
-    import io
+    from django.http import HttpResponse, StreamingHttpResponse
+
+    if export_format != 'csv' and export_format not in available_formats():
+        messages.error(request, f"Export format '{export_format}' is not available.")
+        return redirect('detailed_reports')
+
+    # Get data based on role
+    if request.user.is_superuser or profile.role == 'hod':
+        students = Student.objects.all()
+    else:
+        assigned_year = profile.assigned_year
+        if assigned_year:
+            students = Student.objects.filter(year=assigned_year, class_teacher=request.user)
+        else:
+            students = Student.objects.none()
+
+    # Apply filters
+    if year_filter:
+        students = students.filter(year=year_filter)
+
+    start_date_obj = date.fromisoformat(start_date) if start_date else None
+    end_date_obj = date.fromisoformat(end_date) if end_date else None
+
+    if report_type == 'summary':
+        columns, rows = SUMMARY_COLUMNS, summary_rows(students, start_date_obj, end_date_obj)
+    else:
+        columns, rows = DETAILED_COLUMNS, detailed_rows(students, start_date_obj, end_date_obj)
+
+    if export_format != 'csv':
+        # Typed columns, streamed in record batches
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream_export(columns, rows, export_format), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="attendance_{report_type}_{date.today()}.{extension}"'
+        )
+        return response
 
     # Create CSV response
     response = HttpResponse(content_type='text/csv')
@@ -1431,36 +1604,16 @@ def export_report_csv(request):
         # Detailed report
         writer.writerow(['Student ID', 'Student Name', 'Year', 'Teacher', 'Date', 'Status', 'Remarks', 'Marked By'])
 
-        # Get data based on role
-        if request.user.is_superuser or profile.role == 'hod':
-            attendances = Attendance.objects.all()
-        else:
-            assigned_year = profile.assigned_year
-            if assigned_year:
-                students = Student.objects.filter(year=assigned_year, class_teacher=request.user)
-                attendances = Attendance.objects.filter(student__in=students)
-            else:
-                attendances = Attendance.objects.none()
-
-        # Apply filters
-        if start_date:
-            attendances = attendances.filter(date__gte=date.fromisoformat(start_date))
-        if end_date:
-            attendances = attendances.filter(date__lte=date.fromisoformat(end_date))
-        if year_filter:
-            students_in_year = Student.objects.filter(year=year_filter)
-            attendances = attendances.filter(student__in=students_in_year)
-
-        for attendance in attendances.order_by('date'):
+        for student_id, first_name, last_name, year, teacher, day, status, remarks, marked_by in rows:
             writer.writerow([
-                attendance.student.student_id,
-                f"{attendance.student.first_name} {attendance.student.last_name}",
-                attendance.student.year,
-                attendance.student.class_teacher.username if attendance.student.class_teacher else 'N/A',
-                attendance.date,
-                attendance.status,
-                attendance.remarks,
-                attendance.marked_by.username
+                student_id,
+                f"{first_name} {last_name}",
+                year,
+                teacher or 'N/A',
+                day,
+                status,
+                remarks,
+                marked_by
             ])
 
     elif report_type == 'summary':
@@ -1469,56 +1622,15 @@ def export_report_csv(request):
             ['Student ID', 'Student Name', 'Year', 'Teacher', 'Total Days', 'Present', 'Absent', 'Late', 'Excused',
              'Attendance %'])
 
-        # Get students based on role
-        if request.user.is_superuser or profile.role == 'hod':
-            students = Student.objects.all()
-        else:
-            assigned_year = profile.assigned_year
-            if assigned_year:
-                students = Student.objects.filter(year=assigned_year, class_teacher=request.user)
-            else:
-                students = Student.objects.none()
-
-        for student in students:
-            # Get attendance with date filter
-            attendances = Attendance.objects.filter(student=student)
-            if start_date:
-                attendances = attendances.filter(date__gte=date.fromisoformat(start_date))
-            if end_date:
-                attendances = attendances.filter(date__lte=date.fromisoformat(end_date))
-            if year_filter and student.year != year_filter:
-                continue
-
-            total_days = attendances.count()
-            present_days = attendances.filter(status='present').count()
-            absent_days = attendances.filter(status='absent').count()
-            late_days = attendances.filter(status='late').count()
-            excused_days = attendances.filter(status='excused').count()
-
-            if total_days > 0:
-                attendance_percentage = (present_days / total_days) * 100
-            else:
-                attendance_percentage = 0
-
-            writer.writerow([
-                student.student_id,
-                f"{student.first_name} {student.last_name}",
-                student.year,
-                student.class_teacher.username if student.class_teacher else 'N/A',
-                total_days,
-                present_days,
-                absent_days,
-                late_days,
-                excused_days,
-                round(attendance_percentage, 2)
-            ])
+        for student_id, first_name, last_name, year, teacher, *figures in rows:
+            writer.writerow([student_id, f"{first_name} {last_name}", year, teacher or 'N/A', *figures])
 
     return response
 
 
 @login_required
 def attendance_analytics(request):
-    """Attendance analytics with charts"""
+    """Attendance analytics with charts (series load from attendance_analytics_data)"""
     try:
         profile = request.user.profile
     except Profile.DoesNotExist:
@@ -1537,55 +1649,8 @@ def attendance_analytics(request):
         month = today.month
         year = today.year
 
-    # Get data based on role
-    if request.user.is_superuser or profile.role == 'hod':
-        students = Student.objects.all()
-        attendances = Attendance.objects.filter(date__year=year, date__month=month)
-    else:
-        assigned_year = profile.assigned_year
-        if assigned_year:
-            students = Student.objects.filter(year=assigned_year, class_teacher=request.user)
-            attendances = Attendance.objects.filter(
-                student__in=students,
-                date__year=year,
-                date__month=month
-            )
-        else:
-            students = Student.objects.none()
-            attendances = Attendance.objects.none()
-            messages.warning(request, 'No year assigned to you.')
-
-    # Calculate daily attendance
-    daily_data = {}
-    for day in range(1, 32):
-        try:
-            day_date = date(year, month, day)
-            day_attendances = attendances.filter(date=day_date)
-            total = day_attendances.count()
-            present = day_attendances.filter(status='present').count()
-
-            if total > 0:
-                percentage = (present / total) * 100
-            else:
-                percentage = 0
-
-            daily_data[day] = {
-                'date': day_date,
-                'total': total,
-                'present': present,
-                'percentage': round(percentage, 2)
-            }
-        except ValueError:
-            # Invalid day for this month (e.g., day 31 in February)
-            pass
-
-    # Calculate status distribution
-    status_counts = {
-        'present': attendances.filter(status='present').count(),
-        'absent': attendances.filter(status='absent').count(),
-        'late': attendances.filter(status='late').count(),
-        'excused': attendances.filter(status='excused').count(),
-    }
+    if not (request.user.is_superuser or profile.role == 'hod') and not profile.assigned_year:
+        messages.warning(request, 'No year assigned to you.')
 
     # Year and month choices
     current_year = today.year
@@ -1599,15 +1664,55 @@ def attendance_analytics(request):
     context = {
         'title': 'Attendance Analytics',
         'profile': profile,
-        'daily_data': daily_data,
-        'status_counts': status_counts,
         'month': month,
         'year': year,
         'year_choices': year_choices,
         'month_choices': month_choices,
-        'total_students': students.count(),
-        'total_attendances': attendances.count(),
         'is_admin': request.user.is_superuser or profile.role == 'hod',
     }
 
-    return render(request, 'core/attendance_analytics.html', context)
\ No newline at end of file
+    return render(request, 'core/attendance_analytics.html', context)
+
+
+@login_required
+@conditional_report(_month_report_scopes)
+def attendance_analytics_data(request):
+    """Daily attendance series and status distribution as compact columnar JSON"""
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        role = 'admin' if request.user.is_superuser else 'teacher'
+        profile = Profile.objects.create(user=request.user, role=role)
+
+    today = date.today()
+    try:
+        month = int(request.GET.get('month', today.month))
+        year = int(request.GET.get('year', today.year))
+        month_bounds(year, month)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid year or month.'}, status=400)
+
+    students = scope_students(request.user, profile)
+    data = daily_summary(students, year, month)
+    return JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+
+
+@staff_member_required
+def profile_list(request):
+    """Request profiles captured with ?__profile=1"""
+    context = {
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'site_header': admin.site.site_header,
+        'has_permission': True,
+    }
+    return render(request, 'admin/profiles.html', context)
+
+
+@staff_member_required
+def profile_download(request, profile_id, extension):
+    """One file of a captured profile (.prof, .collapsed or .json)"""
+    path = profile_file_path(profile_id, '.' + extension)
+    if path is None:
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
@@ -1,71 +1,434 @@
 ﻿// attendance.js - Attendance marking functionality
 document.addEventListener('DOMContentLoaded', function() {
-    const attendanceSelects = document.querySelectorAll('.attendance-status');
-    
-    attendanceSelects.forEach(select => {
-        // Set initial color
-        updateRowColor(select);
-        
-        // Update color on change
-        select.addEventListener('change', function() {
-            updateRowColor(this);
-        });
-    });
+    const attendanceForm = document.getElementById('attendance-form');
+    const rosterData = document.getElementById('attendance-roster');
+    const viewport = document.getElementById('roster-viewport');
+
+    if (!attendanceForm || !rosterData || !viewport) {
+        return;
+    }
+
+    AttendanceRoster.init(viewport, JSON.parse(rosterData.textContent));
+    AttendanceSync.init(attendanceForm, AttendanceRoster);
 
-    // Mark all present button
     const markAllPresentBtn = document.getElementById('mark-all-present');
     if (markAllPresentBtn) {
-        markAllPresentBtn.addEventListener('click', function() {
-            attendanceSelects.forEach(select => {
-                select.value = 'present';
-                updateRowColor(select);
-            });
-        });
+        markAllPresentBtn.addEventListener('click', () => AttendanceRoster.setAll('present'));
     }
 
-    // Mark all absent button
     const markAllAbsentBtn = document.getElementById('mark-all-absent');
     if (markAllAbsentBtn) {
-        markAllAbsentBtn.addEventListener('click', function() {
-            attendanceSelects.forEach(select => {
-                select.value = 'absent';
-                updateRowColor(select);
+        markAllAbsentBtn.addEventListener('click', () => AttendanceRoster.setAll('absent'));
+    }
+});
+
+const STATUS_LABELS = {present: 'Present', absent: 'Absent', late: 'Late', excused: 'Excused'};
+const STATUS_ROW_CLASSES = {present: 'table-success', absent: 'table-danger', late: 'table-warning', excused: 'table-info'};
+const STATUS_KEYS = {p: 'present', a: 'absent', l: 'late', e: 'excused'};
+
+// Virtualized marking list: the roster arrives as JSON rows of
+// [pk, student ID, name, saved status, record version] and only the rows in view (plus
+// `overscan` on either side) exist in the DOM. Spacer rows above and
+// below keep the scrollbar true to the full roster; row elements are
+// reused as the window moves.
+const AttendanceRoster = {
+    rowHeight: 48,
+    overscan: 10,
+
+    init(viewport, rows) {
+        this.viewport = viewport;
+        this.body = viewport.querySelector('tbody');
+        this.students = rows.map(([id, studentId, name, saved, version]) => ({
+            id: id, studentId: studentId, name: name, saved: saved, status: saved || 'present', version: version,
+        }));
+        this.byId = new Map(this.students.map(student => [student.id, student]));
+        this.cursor = 0;
+        this.pool = [];
+        this.onChange = () => {};
+
+        this.topSpacer = this.spacer();
+        this.bottomSpacer = this.spacer();
+        this.body.append(this.topSpacer, this.bottomSpacer);
+
+        viewport.addEventListener('scroll', () => this.scheduleRender());
+        window.addEventListener('resize', () => this.scheduleRender());
+        viewport.addEventListener('keydown', event => this.onKey(event));
+
+        this.body.addEventListener('change', event => {
+            const select = event.target.closest('.attendance-status');
+            if (select) {
+                this.setStatus([this.students[Number(select.dataset.index)]], select.value);
+            }
+        });
+        this.body.addEventListener('click', event => {
+            const row = event.target.closest('tr.roster-row');
+            if (row) {
+                this.moveCursor(Number(row.dataset.index), false);
+            }
+        });
+
+        this.render();
+        // Measure the real row height once there is a row to measure
+        if (this.pool.length && this.pool[0].offsetHeight) {
+            this.rowHeight = this.pool[0].offsetHeight;
+            this.render();
+        }
+    },
+
+    spacer() {
+        const row = document.createElement('tr');
+        row.className = 'roster-spacer';
+        row.setAttribute('aria-hidden', 'true');
+        const cell = document.createElement('td');
+        cell.colSpan = 4;
+        row.append(cell);
+        return row;
+    },
+
+    createRow() {
+        const row = document.createElement('tr');
+        row.className = 'roster-row';
+        row.append(document.createElement('td'), document.createElement('td'), document.createElement('td'));
+
+        const select = document.createElement('select');
+        select.className = 'form-select form-select-sm attendance-status';
+        // The list itself takes the keyboard; selects are for the mouse
+        select.tabIndex = -1;
+        Object.entries(STATUS_LABELS).forEach(([value, label]) => select.add(new Option(label, value)));
+        const cell = document.createElement('td');
+        cell.append(select);
+        row.append(cell);
+        return row;
+    },
+
+    scheduleRender() {
+        if (!this.renderPending) {
+            this.renderPending = true;
+            requestAnimationFrame(() => {
+                this.renderPending = false;
+                this.render();
             });
+        }
+    },
+
+    render() {
+        const total = this.students.length;
+        const first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        const visible = Math.ceil(this.viewport.clientHeight / this.rowHeight) + 2 * this.overscan;
+        const last = Math.min(total, first + visible);
+
+        while (this.pool.length < last - first) {
+            const row = this.createRow();
+            this.pool.push(row);
+            this.body.insertBefore(row, this.bottomSpacer);
+        }
+        this.pool.forEach((row, offset) => {
+            const index = first + offset;
+            row.hidden = index >= last;
+            if (!row.hidden) {
+                this.fillRow(row, index);
+            }
         });
-    }
 
-    // Select all checkbox
-    const selectAllCheckbox = document.getElementById('select-all-students');
-    if (selectAllCheckbox) {
-        selectAllCheckbox.addEventListener('change', function() {
-            const checkboxes = document.querySelectorAll('.student-checkbox');
-            checkboxes.forEach(checkbox => {
-                checkbox.checked = this.checked;
+        this.topSpacer.firstChild.style.height = `${first * this.rowHeight}px`;
+        this.bottomSpacer.firstChild.style.height = `${(total - last) * this.rowHeight}px`;
+        this.first = first;
+    },
+
+    fillRow(row, index) {
+        const student = this.students[index];
+        const [number, studentId, name, statusCell] = row.children;
+        const select = statusCell.firstChild;
+
+        row.dataset.index = index;
+        row.dataset.studentId = student.id;
+        number.textContent = index + 1;
+        studentId.textContent = student.studentId;
+        name.textContent = student.name;
+        select.dataset.index = index;
+        select.value = student.status;
+
+        row.classList.remove(...Object.values(STATUS_ROW_CLASSES));
+        row.classList.add(STATUS_ROW_CLASSES[student.status]);
+        row.classList.toggle('roster-cursor', index === this.cursor);
+    },
+
+    setStatus(students, status) {
+        const changed = students.filter(student => student.status !== status);
+        changed.forEach(student => {
+            student.status = status;
+        });
+        if (changed.length) {
+            this.onChange(changed);
+            this.render();
+        }
+    },
+
+    setAll(status) {
+        this.setStatus(this.students, status);
+    },
+
+    moveCursor(index, scroll = true) {
+        this.cursor = Math.max(0, Math.min(this.students.length - 1, index));
+        if (scroll) {
+            // Rows sit below the sticky header
+            const header = this.viewport.querySelector('thead').offsetHeight;
+            const top = this.cursor * this.rowHeight;
+            const height = this.viewport.clientHeight - header;
+            if (top < this.viewport.scrollTop) {
+                this.viewport.scrollTop = top;
+            } else if (top + this.rowHeight > this.viewport.scrollTop + height) {
+                this.viewport.scrollTop = top + this.rowHeight - height;
+            }
+        }
+        this.render();
+    },
+
+    onKey(event) {
+        if (event.target.tagName === 'SELECT' || event.ctrlKey || event.metaKey || event.altKey) {
+            return;
+        }
+        const page = Math.max(1, Math.floor(this.viewport.clientHeight / this.rowHeight) - 1);
+        const student = this.students[this.cursor];
+        const key = event.key.toLowerCase();
+
+        if (event.key === 'ArrowDown' || key === 'j') {
+            this.moveCursor(this.cursor + 1);
+        } else if (event.key === 'ArrowUp' || key === 'k') {
+            this.moveCursor(this.cursor - 1);
+        } else if (event.key === 'PageDown') {
+            this.moveCursor(this.cursor + page);
+        } else if (event.key === 'PageUp') {
+            this.moveCursor(this.cursor - page);
+        } else if (event.key === 'Home') {
+            this.moveCursor(0);
+        } else if (event.key === 'End') {
+            this.moveCursor(this.students.length - 1);
+        } else if (STATUS_KEYS[key] && event.shiftKey) {
+            this.setAll(STATUS_KEYS[key]);
+        } else if (STATUS_KEYS[key] && student) {
+            this.setStatus([student], STATUS_KEYS[key]);
+            this.moveCursor(this.cursor + 1);
+        } else if (event.key === ' ' && student) {
+            // Exceptions to "all present": flip between present and absent
+            this.setStatus([student], student.status === 'present' ? 'absent' : 'present');
+            this.moveCursor(this.cursor + 1);
+        } else {
+            return;
+        }
+        event.preventDefault();
+    },
+};
+
+// Offline-capable saving: edits are kept in a localStorage queue (so they
+// survive reloads and dropped connections) and sent as one JSON batch of the
+// changed rows only. Failed sends are retried with exponential backoff.
+// Changes carry absolute statuses, so re-sending a batch is harmless.
+const AttendanceSync = {
+    minDelay: 1000,
+    maxDelay: 60000,
+
+    init(form, roster) {
+        this.form = form;
+        this.roster = roster;
+        this.url = form.dataset.batchUrl;
+        this.date = form.dataset.date;
+        this.queueKey = form.dataset.queueKey || 'attendance-queue';
+        this.statusElement = document.getElementById('sync-status');
+        this.retryDelay = this.minDelay;
+        this.retryTimer = null;
+        this.sending = false;
+
+        // Edits for this date that never reached the server
+        Object.values(this.loadQueue()).forEach(change => {
+            const student = this.roster.byId.get(change.student);
+            if (student && change.date === this.date) {
+                student.status = change.status;
+            }
+        });
+        roster.render();
+        roster.onChange = students => this.recordChanges(students);
+
+        form.addEventListener('submit', event => {
+            event.preventDefault();
+            this.queueUnmarked();
+            this.flush();
+        });
+
+        window.addEventListener('online', () => {
+            this.retryDelay = this.minDelay;
+            this.flush();
+        });
+
+        this.flush();
+    },
+
+    loadQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(this.queueKey)) || {};
+        } catch (e) {
+            return {};
+        }
+    },
+
+    storeQueue(queue) {
+        try {
+            localStorage.setItem(this.queueKey, JSON.stringify(queue));
+        } catch (e) {
+            // Storage full or disabled: the queue only lives for this page
+        }
+    },
+
+    changeKey(change) {
+        return `${change.date}:${change.student}`;
+    },
+
+    // Only statuses that differ from what the server has are queued
+    recordChanges(students) {
+        const queue = this.loadQueue();
+        students.forEach(student => {
+            const change = {student: student.id, date: this.date, status: student.status, version: student.version};
+            if (student.status === student.saved) {
+                // Back to what the server already has
+                delete queue[this.changeKey(change)];
+            } else {
+                queue[this.changeKey(change)] = change;
+            }
+        });
+        this.storeQueue(queue);
+        this.showPending(queue);
+    },
+
+    // Students never marked for this date are saved with whatever is selected
+    queueUnmarked() {
+        const queue = this.loadQueue();
+        this.roster.students.forEach(student => {
+            if (!student.saved) {
+                const change = {student: student.id, date: this.date, status: student.status, version: student.version};
+                queue[this.changeKey(change)] = change;
+            }
+        });
+        this.storeQueue(queue);
+    },
+
+    flush() {
+        if (this.sending) {
+            return;
+        }
+        clearTimeout(this.retryTimer);
+
+        const changes = Object.values(this.loadQueue());
+        if (!changes.length) {
+            return;
+        }
+
+        this.sending = true;
+        this.setStatus(`Saving ${changes.length} change(s)...`, 'text-muted');
+
+        fetch(this.url, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.form.querySelector('[name=csrfmiddlewaretoken]').value,
+            },
+            body: JSON.stringify({batch_id: `${Date.now()}-${Math.random().toString(36).slice(2)}`, changes: changes}),
+        })
+            .then(response => {
+                // Server errors and throttling are worth retrying; other failures aren't
+                if (response.status >= 500 || response.status === 408 || response.status === 429) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json().then(data => ({ok: response.ok, data: data}));
+            })
+            .then(({ok, data}) => {
+                this.sending = false;
+                if (!ok) {
+                    this.setStatus(data.error || 'Could not save attendance.', 'text-danger');
+                    return;
+                }
+                this.acknowledge(changes, data);
+            })
+            .catch(() => {
+                this.sending = false;
+                this.scheduleRetry(changes.length);
             });
+    },
+
+    // Conflicts (someone else marked the student since we last saw the
+    // record) are settled by the server keeping the newer mark; the page
+    // adopts it and the teacher can change it again
+    acknowledge(changes, data) {
+        const rejected = new Map(data.errors.map(error => [error.index, error.error]));
+        const conflicts = new Map(data.conflicts.map(conflict => [conflict.index, conflict]));
+        const versions = new Map(data.versions.map(entry => [entry.index, entry.version]));
+        const queue = this.loadQueue();
+
+        changes.forEach((change, index) => {
+            const key = this.changeKey(change);
+            const conflict = conflicts.get(index);
+            // Leave entries edited again while the request was in flight
+            if (queue[key] && (queue[key].status === change.status || conflict)) {
+                delete queue[key];
+            } else if (queue[key] && versions.has(index)) {
+                queue[key].version = versions.get(index);
+            }
+            const student = change.date === this.date ? this.roster.byId.get(change.student) : null;
+            if (!student || rejected.has(index)) {
+                return;
+            }
+            if (conflict) {
+                student.saved = conflict.status || '';
+                student.status = conflict.status || 'present';
+                student.version = conflict.version;
+            } else {
+                student.saved = change.status;
+                student.version = versions.get(index);
+            }
         });
-    }
-});
+        this.storeQueue(queue);
+        this.retryDelay = this.minDelay;
+        if (conflicts.size) {
+            this.roster.render();
+        }
 
-function updateRowColor(selectElement) {
-    const row = selectElement.closest('tr');
-    const status = selectElement.value;
-    
-    // Remove all status classes
-    row.classList.remove('table-success', 'table-danger', 'table-warning', 'table-info');
-    
-    // Add appropriate class
-    switch(status) {
-        case 'present':
-            row.classList.add('table-success');
-            break;
-        case 'absent':
-            row.classList.add('table-danger');
-            break;
-        case 'late':
-            row.classList.add('table-warning');
-            break;
-        case 'excused':
-            row.classList.add('table-info');
-            break;
-    }
-}
+        if (rejected.size) {
+            this.setStatus(`${rejected.size} change(s) rejected: ${[...new Set(rejected.values())].join(' ')}`, 'text-danger');
+        } else if (conflicts.size) {
+            const markers = [...new Set(data.conflicts.map(conflict => conflict.marked_by).filter(Boolean))];
+            this.setStatus(
+                `${conflicts.size} student(s) were marked meanwhile${markers.length ? ` by ${markers.join(', ')}` : ''}; ` +
+                'their marks are shown.',
+                'text-warning'
+            );
+        } else if (Object.keys(queue).length) {
+            this.flush();
+        } else {
+            this.setStatus('All changes saved.', 'text-success');
+        }
+    },
+
+    scheduleRetry(pending) {
+        // Exponential backoff with jitter so a room of teachers doesn't retry in lockstep
+        const delay = this.retryDelay * (1 + Math.random() / 2);
+        this.retryDelay = Math.min(this.retryDelay * 2, this.maxDelay);
+        this.setStatus(
+            `Offline: ${pending} change(s) kept on this device, retrying in ${Math.round(delay / 1000)}s.`,
+            'text-warning'
+        );
+        this.retryTimer = setTimeout(() => this.flush(), delay);
+    },
+
+    showPending(queue) {
+        const pending = Object.keys(queue).length;
+        this.setStatus(pending ? `${pending} unsaved change(s).` : '', 'text-muted');
+    },
+
+    setStatus(message, className) {
+        if (!this.statusElement) {
+            return;
+        }
+        this.statusElement.className = `ms-2 ${className}`;
+        this.statusElement.textContent = message;
+    },
+};
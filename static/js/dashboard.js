@@ -38,8 +38,126 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Calculate attendance percentage
     updateAttendancePercentage();
+
+    // Live marking progress (Admin/HOD)
+    const progressCard = document.getElementById('marking-progress');
+    if (progressCard) {
+        MarkingProgress.init(progressCard);
+    }
 });
 
+// Today's marking progress, kept current from the server's event stream:
+// a "snapshot" event carries every year and class, a "progress" event the
+// current rows of the class years that just changed.
+const MarkingProgress = {
+    years: new Map(),
+    classes: new Map(),
+
+    init(card) {
+        this.card = card;
+        this.badge = card.querySelector('[data-live-status]');
+        if (!window.EventSource) {
+            return;
+        }
+
+        const source = new EventSource(card.dataset.streamUrl);
+        source.addEventListener('snapshot', event => {
+            this.years.clear();
+            this.classes.clear();
+            this.apply(JSON.parse(event.data));
+        });
+        source.addEventListener('progress', event => this.apply(JSON.parse(event.data)));
+        source.addEventListener('open', () => this.setStatus('Live', 'bg-success'));
+        source.addEventListener('error', () => {
+            // EventSource reconnects by itself unless the server closed the feed
+            if (source.readyState === EventSource.CLOSED) {
+                this.setStatus('Not live', 'bg-secondary');
+            } else {
+                this.setStatus('Reconnecting…', 'bg-warning');
+            }
+        });
+    },
+
+    apply(data) {
+        const changedYears = new Set(data.years.map(row => row.year));
+        for (const [key, row] of this.classes) {
+            if (changedYears.has(row.year)) {
+                this.classes.delete(key);
+            }
+        }
+        data.years.forEach(row => this.years.set(row.key, row));
+        data.classes.forEach(row => this.classes.set(row.key, row));
+        this.render();
+    },
+
+    render() {
+        const years = [...this.years.values()].sort((a, b) => a.year.localeCompare(b.year));
+        const classes = [...this.classes.values()].sort(
+            (a, b) => a.year.localeCompare(b.year) || a.teacher.localeCompare(b.teacher)
+        );
+
+        this.card.querySelector('[data-progress-years]').replaceChildren(...years.map(row => this.yearBlock(row)));
+        const tbody = this.card.querySelector('[data-progress-classes]');
+        if (classes.length) {
+            tbody.replaceChildren(...classes.map(row => this.classRow(row)));
+        }
+
+        ['present', 'absent'].forEach(status => {
+            const total = document.querySelector(`[data-progress-total="${status}"]`);
+            if (total) {
+                total.textContent = years.reduce((sum, row) => sum + row[status], 0);
+            }
+        });
+    },
+
+    yearBlock(row) {
+        const block = document.createElement('div');
+        block.className = 'col-md-3 mb-3';
+
+        const name = document.createElement('div');
+        name.className = 'small fw-bold';
+        name.textContent = row.name;
+
+        const progress = document.createElement('div');
+        progress.className = 'progress';
+        progress.style.height = '1.25rem';
+        const bar = document.createElement('div');
+        bar.className = 'progress-bar bg-success';
+        bar.setAttribute('role', 'progressbar');
+        bar.style.width = `${row.students ? Math.round(row.marked / row.students * 100) : 0}%`;
+        bar.textContent = `${row.marked}/${row.students}`;
+        progress.appendChild(bar);
+
+        const counts = document.createElement('div');
+        counts.className = 'small text-muted';
+        counts.textContent = `${row.present} present, ${row.absent} absent, ${row.late} late, ${row.excused} excused`;
+
+        block.append(name, progress, counts);
+        return block;
+    },
+
+    classRow(row) {
+        const tr = document.createElement('tr');
+        if (row.students && row.marked >= row.students) {
+            tr.className = 'table-success';
+        }
+        [row.name, row.teacher, `${row.marked}/${row.students}`, row.present, row.absent, row.late, row.excused]
+            .forEach(value => {
+                const td = document.createElement('td');
+                td.textContent = value;
+                tr.appendChild(td);
+            });
+        return tr;
+    },
+
+    setStatus(text, className) {
+        if (this.badge) {
+            this.badge.textContent = text;
+            this.badge.className = `badge ${className}`;
+        }
+    },
+};
+
 function updateAttendancePercentage() {
     const presentElement = document.querySelector('[data-stat="present"]');
     const totalElement = document.querySelector('[data-stat="total"]');
@@ -10,8 +10,17 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeCharts();
     handleReportFilters();
     handleExportButtons();
+    loadReportData();
 });
 
+// Report data loaded from the JSON endpoints (columnar arrays)
+const reportState = {
+    kind: null,
+    data: null,
+    year: '',
+    search: ''
+};
+
 function initializeReportsPage() {
     // Initialize date range picker
     const dateRangeInput = document.getElementById('date-range');
@@ -48,33 +57,292 @@ function updateDateRange() {
 }
 
 function filterByClass() {
-    const selectedClass = this.value;
-    const rows = document.querySelectorAll('.student-row');
+    reportState.year = this.value;
+    renderReportTable();
+}
 
-    rows.forEach(row => {
-        const studentClass = row.dataset.class;
-        if (!selectedClass || studentClass === selectedClass) {
-            row.style.display = '';
-        } else {
-            row.style.display = 'none';
+function searchReports() {
+    reportState.search = this.value.toLowerCase();
+    renderReportTable();
+}
+
+function loadReportData() {
+    const container = document.querySelector('[data-report-url]');
+    if (!container) return;
+
+    reportState.kind = container.dataset.reportKind;
+
+    fetch(container.dataset.reportUrl, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            reportState.data = data;
+            if (reportState.kind === 'monthly') {
+                renderMonthlySummary(data);
+            } else if (reportState.kind === 'analytics') {
+                renderAnalyticsSummary(data);
+                renderAnalyticsCalendar(data);
+                renderAnalyticsCharts(data);
+            }
+            renderReportTable();
+        })
+        .catch(error => {
+            console.error('Failed to load report data', error);
+            const body = document.getElementById('report-table-body');
+            if (body) {
+                body.innerHTML = '<tr><td colspan="11" class="text-center py-4 text-danger">' +
+                    'Could not load report data. Please refresh the page.</td></tr>';
+            }
+        });
+}
+
+function setSummary(name, value) {
+    document.querySelectorAll(`[data-summary="${name}"]`).forEach(element => {
+        element.textContent = value;
+    });
+}
+
+function percentageClass(percentage, prefix) {
+    if (percentage >= 90) return `${prefix}-success`;
+    if (percentage >= 75) return `${prefix}-info`;
+    if (percentage >= 60) return `${prefix}-warning`;
+    return `${prefix}-danger`;
+}
+
+function percentageLabel(percentage) {
+    if (percentage >= 90) return 'Excellent';
+    if (percentage >= 75) return 'Good';
+    if (percentage >= 60) return 'Fair';
+    return 'Poor';
+}
+
+function progressCell(percentage) {
+    return `<div class="d-flex align-items-center">
+                <div class="progress flex-grow-1 me-2" style="height: 20px;">
+                    <div class="progress-bar ${percentageClass(percentage, 'bg')}" style="width: ${percentage}%"></div>
+                </div>
+                <span>${percentage}%</span>
+            </div>`;
+}
+
+function statusBadge(percentage) {
+    return `<span class="badge ${percentageClass(percentage, 'bg')}">${percentageLabel(percentage)}</span>`;
+}
+
+function escapeHtml(value) {
+    const element = document.createElement('span');
+    element.textContent = value;
+    return element.innerHTML;
+}
+
+function renderMonthlySummary(data) {
+    const summary = data.summary;
+    Object.keys(summary).forEach(name => setSummary(name, summary[name]));
+
+    const totalDays = summary.total_present + summary.total_absent + summary.total_late + summary.total_excused;
+    ['present', 'absent', 'late', 'excused'].forEach(status => {
+        const bar = document.querySelector(`[data-share="${status}"]`);
+        if (bar) {
+            bar.style.width = totalDays > 0 ? `${Math.round(summary[`total_${status}`] / totalDays * 100)}%` : '0%';
         }
     });
+
+    const alert = document.getElementById('performance-alert');
+    if (alert) {
+        const overall = summary.overall_percentage;
+        const messages = {
+            Excellent: 'Excellent overall attendance for this month!',
+            Good: 'Good overall attendance for this month.',
+            Fair: 'Fair attendance. Some improvement needed.',
+            Poor: 'Low attendance. Immediate attention required.'
+        };
+        alert.className = `alert ${percentageClass(overall, 'alert')}`;
+        alert.querySelector('span').textContent = messages[percentageLabel(overall)];
+    }
 }
 
-function searchReports() {
-    const searchTerm = this.value.toLowerCase();
-    const rows = document.querySelectorAll('.student-row');
+function renderAnalyticsSummary(data) {
+    setSummary('total_students', data.total_students);
+    setSummary('total_attendances', data.total_attendances);
 
-    rows.forEach(row => {
-        const studentName = row.dataset.name.toLowerCase();
-        const studentId = row.dataset.id.toLowerCase();
+    const days = data.days;
+    const recorded = days.percentage.filter((percentage, i) => days.total[i] > 0);
+    const average = recorded.length ? recorded.reduce((a, b) => a + b, 0) / recorded.length : 0;
+    setSummary('avg_daily', average.toFixed(1));
 
-        if (studentName.includes(searchTerm) || studentId.includes(searchTerm)) {
-            row.style.display = '';
+    let best = -1;
+    days.percentage.forEach((percentage, i) => {
+        if (days.total[i] > 0 && (best < 0 || percentage > days.percentage[best])) best = i;
+    });
+    setSummary('best_day', best >= 0 ? `Day ${days.day[best]}` : 'N/A');
+    setSummary('best_day_note', best >= 0 ? `${days.percentage[best]}% attendance` : '');
+}
+
+function renderAnalyticsCalendar(data) {
+    const grid = document.getElementById('analytics-calendar');
+    if (!grid) return;
+
+    const days = data.days;
+    const cells = [];
+    for (let i = 0; i < days.weekday[0]; i++) {
+        cells.push('<div></div>');
+    }
+    days.day.forEach((day, i) => {
+        if (days.total[i] > 0) {
+            const percentage = days.percentage[i];
+            const text = percentage >= 60 && percentage < 75 ? '' : ' text-white';
+            cells.push(`<div class="day-box ${percentageClass(percentage, 'bg')}${text}"
+                title="Day ${day}: ${percentage}% (${days.present[i]}/${days.total[i]})">${day}</div>`);
         } else {
-            row.style.display = 'none';
+            cells.push(`<div class="day-box bg-light text-muted" title="Day ${day}: No data">${day}</div>`);
         }
     });
+    grid.insertAdjacentHTML('beforeend', cells.join(''));
+}
+
+function renderAnalyticsCharts(data) {
+    if (typeof Chart === 'undefined') {
+        console.warn('Chart.js not loaded');
+        return;
+    }
+
+    const days = data.days;
+    const dailyCtx = document.getElementById('dailyChart');
+    if (dailyCtx) {
+        new Chart(dailyCtx.getContext('2d'), {
+            type: 'line',
+            data: {
+                labels: days.day,
+                datasets: [{
+                    label: 'Attendance Percentage',
+                    data: days.percentage,
+                    borderColor: '#007bff',
+                    backgroundColor: 'rgba(0, 123, 255, 0.1)',
+                    borderWidth: 2,
+                    fill: true,
+                    tension: 0.4
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: {
+                    y: { beginAtZero: true, max: 100, title: { display: true, text: 'Attendance %' } },
+                    x: { title: { display: true, text: 'Day of Month' } }
+                },
+                plugins: {
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                const index = context.dataIndex;
+                                return [
+                                    `Day ${context.label}: ${days.percentage[index]}%`,
+                                    `Present: ${days.present[index]} of ${days.total[index]}`
+                                ];
+                            }
+                        }
+                    }
+                }
+            }
+        });
+    }
+
+    const statusCtx = document.getElementById('statusChart');
+    if (statusCtx) {
+        const counts = data.status_counts;
+        new Chart(statusCtx.getContext('2d'), {
+            type: 'doughnut',
+            data: {
+                labels: ['Present', 'Absent', 'Late', 'Excused'],
+                datasets: [{
+                    data: [counts.present, counts.absent, counts.late, counts.excused],
+                    backgroundColor: ['#28a745', '#dc3545', '#ffc107', '#17a2b8'],
+                    borderWidth: 1
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: { position: 'bottom' },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                const label = context.label || '';
+                                const value = context.raw || 0;
+                                const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                                const percentage = total > 0 ? Math.round((value / total) * 100) : 0;
+                                return `${label}: ${value} (${percentage}%)`;
+                            }
+                        }
+                    }
+                }
+            }
+        });
+    }
+}
+
+function renderReportTable() {
+    const body = document.getElementById('report-table-body');
+    if (!body || !reportState.data) return;
+
+    if (reportState.kind === 'monthly') {
+        renderMonthlyRows(body, reportState.data.students);
+    } else if (reportState.kind === 'analytics') {
+        renderDailyRows(body, reportState.data);
+    }
+}
+
+function renderMonthlyRows(body, students) {
+    const rows = [];
+    let shown = 0;
+    for (let i = 0; i < students.id.length; i++) {
+        if (reportState.year && students.year[i] !== reportState.year) continue;
+        if (reportState.search &&
+            !students.name[i].toLowerCase().includes(reportState.search) &&
+            !students.student_id[i].toLowerCase().includes(reportState.search)) continue;
+
+        shown++;
+        rows.push(`<tr>
+            <td>${shown}</td>
+            <td><strong>${escapeHtml(students.student_id[i])}</strong></td>
+            <td>${escapeHtml(students.name[i])}</td>
+            <td>Year ${escapeHtml(students.year[i])}</td>
+            <td>${students.total[i]}</td>
+            <td><span class="badge bg-success attendance-badge">${students.present[i]}</span></td>
+            <td><span class="badge bg-danger attendance-badge">${students.absent[i]}</span></td>
+            <td><span class="badge bg-warning attendance-badge">${students.late[i]}</span></td>
+            <td><span class="badge bg-info attendance-badge">${students.excused[i]}</span></td>
+            <td>${progressCell(students.percentage[i])}</td>
+            <td>${statusBadge(students.percentage[i])}</td>
+        </tr>`);
+    }
+    body.innerHTML = rows.join('');
+
+    const empty = document.getElementById('report-empty');
+    if (empty) {
+        empty.classList.toggle('d-none', students.id.length > 0);
+    }
+}
+
+function renderDailyRows(body, data) {
+    const weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+    const month = String(data.month).padStart(2, '0');
+    const days = data.days;
+
+    body.innerHTML = days.day.map((day, i) => `<tr>
+            <td>${data.year}-${month}-${String(day).padStart(2, '0')}</td>
+            <td>${weekdays[days.weekday[i]]}</td>
+            <td>${days.total[i]}</td>
+            <td>${days.present[i]}</td>
+            <td>${progressCell(days.percentage[i])}</td>
+            <td>${statusBadge(days.percentage[i])}</td>
+        </tr>`).join('');
 }
 
 function initializeCharts() {
@@ -247,7 +515,7 @@ function handleReportFilters() {
 function handleExportButtons() {
     // CSV Export
     const csvExportBtn = document.getElementById('export-csv');
-    if (csvExportBtn) {
+    if (csvExportBtn && typeof showNotification === 'function') {
         csvExportBtn.addEventListener('click', function() {
             showNotification('Preparing CSV download...', 'info');
         });
@@ -279,5 +547,6 @@ function debounce(func, wait) {
 window.Reports = {
     initializeCharts,
     filterByClass,
-    searchReports
+    searchReports,
+    loadReportData
 };
\ No newline at end of file